@@ -0,0 +1,342 @@
+from array import array
+from functools import partial
+from math import sqrt
+from time import perf_counter
+
+import pygame
+
+from settings import *
+
+# enemy states, stored in the batch as their index in this tuple
+ENEMY_STATES = ('idle', 'move', 'attack', 'attack_prepare', 'attack_idle', 'return')
+IDLE, MOVE, ATTACK, ATTACK_PREPARE, ATTACK_IDLE, RETURN = range(len(ENEMY_STATES))
+ATTACKING = (ATTACK, ATTACK_IDLE, ATTACK_PREPARE, MOVE) # states which need the player in sight
+URGENT = (ATTACK, ATTACK_IDLE, ATTACK_PREPARE) # states whose timing matters most
+
+# how often each enemy's ai is run
+ACTIVE = 0 		# every tick
+REDUCED = 1 	# every REDUCED_RATE ticks
+DORMANT = 2 	# not at all (only animated)
+
+REDUCED_RATE = 4 # ticks between updates of enemies running at a reduced rate
+
+budget = AI_BUDGET # most time (ms) spent moving enemies and on their decisions each tick, None for no limit
+
+def set_budget(new_budget):
+	# a time budget makes which enemies think depend on how fast the machine is,
+	# so it is turned off when the same run needs to play out the same way again
+	global budget
+	budget = new_budget
+
+
+class EnemyBatch:
+	'''
+	the state of every enemy, kept in flat arrays with one slot per enemy. the ai
+	of all awake enemies is run in one pass over the arrays each tick (distances,
+	state changes and movement), instead of through each sprite's own attributes
+	and vectors. cooldowns are left to timers, which flip an enemy's flags once
+	they run out
+	'''
+	def __init__(self, sight, navigator, timers):
+		self.sight = sight 				# checks if walls or corridors block view of the player
+		self.navigator = navigator 		# shared flow fields, for finding a way around walls
+		self.timers = timers 			# ends cooldowns
+
+		# same for every enemy
+		self.speed = ENEMY['speed']
+		self.atk_radius = ENEMY['attack radius'] 	# distance from player which enemy will attempt to attack at
+		self.ctn_radius = ENEMY['caution radius'] 	# disance from player which enemy will follow player at
+		self.atk_cooldown = 800		# time to cool down after attack
+		self.full_prep = 700		# amount of time it takes to fully prep attack
+		self.invul_duration = 560 	# duration of invulnerability
+
+		self.enemies = [] 			# sprite in each slot
+		self.alive = [] 			# slots of enemies which haven't been killed, in order
+		self.busy = set() 			# slots of enemies doing something, rather than idling at their spawn
+		self.prep_timers = [] 		# timer preparing each enemy's attack, if it is preparing one
+
+		# per enemy data
+		self.x = array('l') 		# hitbox centre
+		self.y = array('l')
+		self.dir_x = array('d') 	# movement direction
+		self.dir_y = array('d')
+		self.dist = array('d') 		# distance from the player, measured each tick
+		self.health = array('d')
+		self.state = array('b')
+		self.prepared = array('b')	# attack has been prepared
+		self.vulnerable = array('b')# can take damage
+		self.cooling = array('b') 	# cooling down after an attack
+
+	def add(self, enemy):
+		# gives the enemy a slot, returning its index
+		slot = len(self.enemies)
+		self.enemies.append(enemy)
+		self.alive.append(slot)
+		self.prep_timers.append(None)
+		for values in (self.x, self.y, self.dir_x, self.dir_y, self.dist):
+			values.append(0)
+		self.health.append(ENEMY['health'])
+		self.state.append(IDLE)
+		self.prepared.append(False)
+		self.vulnerable.append(True)
+		self.cooling.append(False)
+		return slot
+
+	def place(self, slot, center):
+		self.x[slot], self.y[slot] = center
+
+	def remove(self, slot):
+		self.alive.remove(slot)
+		self.busy.discard(slot)
+
+	def measure(self, player, slots):
+		# distance from each enemy to the player
+		player_x, player_y = player.rect.center
+		x, y, dist = self.x, self.y, self.dist
+		for slot in slots:
+			dx = player_x - x[slot]
+			dy = player_y - y[slot]
+			dist[slot] = sqrt(dx*dx + dy*dy)
+
+	def wake(self, slot):
+		# makes sure the enemy is updated from now on (e.g. once it has been hit)
+		self.busy.add(slot)
+
+	def is_busy(self, slot):
+		# doing something (or about to), rather than standing idle
+		return (self.state[slot] != IDLE or self.prepared[slot] or
+			not self.vulnerable[slot] or self.cooling[slot])
+
+	def finish_prep(self, slot):
+		# attack is only prepared if the enemy kept preparing it the whole time
+		self.prep_timers[slot] = None
+		if self.state[slot] == ATTACK_PREPARE:
+			self.prepared[slot] = True
+
+	def finish_cooldown(self, slot):
+		self.cooling[slot] = False
+
+	def update(self, player, slots):
+		# moves the enemies in the given slots (they are animated when drawn). the
+		# distance to the player of those which moved is measured again
+		speed = self.speed
+		dir_x, dir_y = self.dir_x, self.dir_y
+		moved = []
+		for slot in slots:
+			enemy = self.enemies[slot]
+
+			# movement - diagonal speed same as when moving horizontally/vertically
+			dx, dy = dir_x[slot], dir_y[slot]
+			if dx or dy:
+				length = sqrt(dx*dx + dy*dy)
+				dx, dy = dx / length, dy / length
+				dir_x[slot], dir_y[slot] = dx, dy
+				enemy.move_by(dx * speed, dy * speed)
+				self.x[slot], self.y[slot] = enemy.hitbox.center
+				moved.append(slot)
+			else:
+				enemy.last_center = enemy.rect.center
+
+			if self.health[slot] <= 0:
+				enemy.die()
+		self.measure(player, moved)
+
+	def think(self, player, slots):
+		# changes the state of the enemies in the given slots in accordance with their own
+		# state and distance to the player, then acts on it. distances are measured
+		# beforehand, by the scheduler and when enemies move
+		player_pos = player.rect.center
+		state, prepared, dist = self.state, self.prepared, self.dist
+
+		for slot in slots:
+			enemy = self.enemies[slot]
+			current = state[slot]
+			can_atk = not self.cooling[slot]
+
+			if current != RETURN and can_atk:
+				# if enemy not returning to initial positon and is able to attack
+				if prepared[slot] and current != ATTACK:
+					# if ready to attack but not in attack state, switch, regardless
+					# of if player in range or not
+					current = ATTACK
+				elif current != ATTACK_PREPARE:
+					# cannot be broken out of attack prep state once started
+					if dist[slot] <= self.atk_radius and not prepared[slot]:
+						current = ATTACK_PREPARE
+						if self.prep_timers[slot]:
+							# preparing again after breaking off, so starts over
+							self.prep_timers[slot].cancel()
+						self.prep_timers[slot] = self.timers.after(
+							self.full_prep, partial(self.finish_prep, slot))
+						enemy.prepare_attack()
+					elif dist[slot] <= self.ctn_radius:
+						# player in notice range, move towards them (to get in attack range)
+						current = MOVE
+					elif not enemy.rect.collidepoint(enemy.return_pos):
+						# return to spawn position
+						current = RETURN
+					else:
+						# stay idle at spawn position
+						current = IDLE
+			elif not can_atk:
+				# cooling down after attack, can't move
+				current = ATTACK_IDLE
+			elif enemy.rect.collidepoint(enemy.return_pos):
+				# at spawn pos, don't need to move
+				current = IDLE
+
+			if current in ATTACKING and not self.sight.can_see(enemy.rect.center, player_pos):
+				# regardless of state, enemies get 'bored' if player obstructed
+				# from view or leaves room
+				if not enemy.rect.collidepoint(enemy.return_pos):
+					current = RETURN
+				else:
+					current = IDLE
+			state[slot] = current
+
+			# setting direction - towards the next cell on the path, or straight
+			# towards the target when already in its cell
+			if current == MOVE:
+				target = self.navigator.step_to_target(enemy.rect.center) or player_pos
+			elif current == RETURN:
+				target = self.navigator.step_to(enemy.rect.center, enemy.return_pos) or enemy.return_pos
+			else:
+				target = None
+			self.dir_x[slot] = self.dir_y[slot] = 0
+			if target:
+				dx = target[0] - self.x[slot]
+				dy = target[1] - self.y[slot]
+				length = sqrt(dx*dx + dy*dy)
+				if length:
+					self.dir_x[slot], self.dir_y[slot] = dx / length, dy / length
+
+			if current == ATTACK:
+				# start cooling down and dmg player if in vicinity
+				self.cooling[slot] = True
+				self.timers.after(self.atk_cooldown, partial(self.finish_cooldown, slot))
+				prepared[slot] = False
+				if dist[slot] <= self.atk_radius:
+					enemy.dmg_player()
+
+			if enemy.aoe_attack:
+				if current == ATTACK_PREPARE:
+					# continue fading in the attack while it is being prepared
+					enemy.aoe_attack.update_alpha()
+				else:
+					enemy.aoe_attack.kill()
+
+
+class AIScheduler:
+	'''
+	decides which enemies run their ai each tick, so that the cost of enemy ai
+	follows the number of enemies near the player rather than the total. idle
+	enemies outside their caution radius are dormant (they could not notice the
+	player anyway), and idle enemies near the player but in another room only
+	check for the player every few ticks. idle enemies stay put at their spawn,
+	so only busy enemies and those the spatial index finds near the player are
+	looked at each tick - the rest are never touched.
+
+	moving and deciding are also kept within a time budget each tick - attacking
+	enemies go first, then those put off from the last tick, then the rest from
+	nearest to furthest. anything that doesn't fit is put off until the next tick,
+	with the enemy staying where it is in the state it was already in. picking
+	which enemies to run (measuring the busy and nearby ones) is not part of the
+	budget, so a tick can still go over it by that much
+	'''
+	def __init__(self, batch, room_graph, spatial_index):
+		self.batch = batch
+		self.room_graph = room_graph 	# finds which room (or corridor) a position is in
+		self.spatial_index = spatial_index 	# finds the enemies near the player
+		self.map_size = (room_graph.width * TILE_SIZE, room_graph.height * TILE_SIZE)
+		self.tick = 0
+		self.rooms = [] 	# room each enemy idles in, by slot
+		self.offsets = [] 	# spreads reduced rate enemies across ticks, by slot
+		self.carried = set() 	# slots put off from the last tick
+		self.deferrals = 0 		# total number of times an enemy was put off
+
+	def room_at(self, pos):
+		# region of the room graph containing pos (in pixels)
+		return self.room_graph.region_at(int(pos[0] // TILE_SIZE), int(pos[1] // TILE_SIZE))
+
+	def add(self, enemy):
+		# enemies are only ever idle at their spawn position, so the room they
+		# idle in is found once
+		self.rooms.append(self.room_at(enemy.return_pos))
+		self.offsets.append(enemy.slot % REDUCED_RATE)
+
+	def nearby(self, player):
+		# slots of the enemies close enough that they could notice the player
+		radius = min(self.batch.ctn_radius, max(self.map_size))
+		area = pygame.Rect(0, 0, radius * 2, radius * 2)
+		area.center = player.rect.center
+		area = area.clip(0, 0, *self.map_size)
+		if (area.width // TILE_SIZE + 1) * (area.height // TILE_SIZE + 1) > len(self.batch.alive):
+			# the area has more cells to look through than there are enemies left
+			return set(self.batch.alive)
+		return {sprite.slot for sprite in self.spatial_index.near(area) if sprite.type == 'enemy'}
+
+	def get_level(self, slot, player_room):
+		# how often an idle enemy is run - busy enemies are run every tick
+		if self.batch.dist[slot] > self.batch.ctn_radius:
+			# too far away to notice the player
+			return DORMANT
+		if self.rooms[slot] != player_room:
+			# close, but the player is most likely out of sight in another room
+			return REDUCED
+		return ACTIVE
+
+	def update(self, player):
+		# runs the ai of the enemies that need it this tick
+		self.tick += 1
+		player_room = self.room_at(player.rect.center)
+		batch = self.batch
+		# in slot order, so enemies are always run in the same order
+		slots = sorted(batch.busy | self.nearby(player))
+		batch.measure(player, slots)
+
+		awake = []
+		for slot in slots:
+			if batch.is_busy(slot):
+				awake.append(slot)
+				continue
+			# idle (again) - only looked at while near the player from now on
+			batch.busy.discard(slot)
+			level = self.get_level(slot, player_room)
+			if level == ACTIVE or (
+				level == REDUCED and (self.tick + self.offsets[slot]) % REDUCED_RATE == 0):
+				awake.append(slot)
+			else:
+				# stays where it is (idle enemies still animate, as that only depends on the tick)
+				enemy = batch.enemies[slot]
+				enemy.last_center = enemy.rect.center
+
+		if budget is None:
+			batch.update(player, awake)
+			# enemies killed during their update don't think
+			thinking = [slot for slot in awake if batch.enemies[slot].alive()]
+			batch.think(player, thinking)
+			# enemies which started doing something are run every tick until they're idle again
+			batch.busy.update(slot for slot in thinking if batch.is_busy(slot))
+			return
+
+		# each enemy is moved and then decides what to do next, one at a time, until
+		# the time is up
+		awake.sort(key=lambda slot: (
+			batch.state[slot] not in URGENT, slot not in self.carried, batch.dist[slot]))
+		deadline = perf_counter() + budget / 1000
+		done = len(awake)
+		for index, slot in enumerate(awake):
+			if index and perf_counter() > deadline:
+				done = index
+				break
+			batch.update(player, (slot,))
+			if batch.enemies[slot].alive():
+				batch.think(player, (slot,))
+				if batch.is_busy(slot):
+					batch.busy.add(slot)
+
+		self.carried = set(awake[done:])
+		self.deferrals += len(self.carried)
+		for slot in self.carried:
+			enemy = batch.enemies[slot]
+			enemy.last_center = enemy.rect.center
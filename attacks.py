@@ -9,21 +9,21 @@ class Sword(pygame.sprite.Sprite):
 	def __init__(self, player, groups):
 		super().__init__(groups)
 		self.type = 'sword'
-		self.direction = player.state.split('_')[0]
-		path = 'graphics/attacks/sword/' + self.direction + '_hitbox.png'
+		self.facing = player.facing
+		path = 'graphics/attacks/sword/' + FACINGS[self.facing] + '_hitbox.png'
 		# hitbox uses images to make it a sprite, so that sprite collision
 		# checks can be made (and sprite groups iterated over)
-		self.image = pygame.image.load(path).convert_alpha()
+		self.image = load_image(path)
 		self.rect = self.image.get_rect(center=player.rect.center)
 		self.update_atk(player)
 
 	def update_atk(self, player):
 		# aligns atk hitbox with current player direction and position
-		if self.direction == 'up':
+		if self.facing == FACE_UP:
 			self.rect.midbottom = player.rect.center + pygame.math.Vector2(0,10)
-		elif self.direction == 'down':
+		elif self.facing == FACE_DOWN:
 			self.rect.midtop = player.rect.center + pygame.math.Vector2(0,4)
-		elif self.direction == 'left': 
+		elif self.facing == FACE_LEFT: 
 			self.rect.midright = player.rect.center + pygame.math.Vector2(5,7)
 		else:
 			self.rect.midleft = player.rect.center + pygame.math.Vector2(-5,7)
@@ -62,7 +62,7 @@ class AOE(pygame.sprite.Sprite):
 		super().__init__(groups)
 
 		# attack image setup
-		self.image = pygame.image.load('graphics/attacks/enemy/aoe.png').convert_alpha()
+		self.image = load_image('graphics/attacks/enemy/aoe.png').copy() # copied, as each attack fades in on its own
 		self.rect = self.image.get_rect(center=pos)
 		self.depth = LAYERS['mid_layer']
 		self.type = 'aoe'
@@ -0,0 +1,351 @@
+import os
+import random
+import pygame
+from argparse import ArgumentParser
+from time import perf_counter
+
+from settings import *
+from timings import FrameStats
+from game_clock import GameClock, set_clock
+
+# stress scenes and benchmarks for measuring the game's performance, run without
+# a window. e.g. python benchmarks.py ecs --count 2000
+
+def setup():
+	# dummy video driver - images can be loaded and drawn, but nothing is shown
+	os.environ['SDL_VIDEODRIVER'] = 'dummy'
+	pygame.init()
+	return pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+
+
+def floor_cells(grid, agent):
+	# centres of every cell the agent can stand in
+	from collision import BLOCKING
+	return [(col * TILE_SIZE + TILE_SIZE // 2, row * TILE_SIZE + TILE_SIZE // 2)
+		for row in range(grid.height) for col in range(grid.width)
+		if not grid.get_flags(col, row) & BLOCKING[agent]]
+
+
+class PlayerPath:
+	'''
+	stands in for the player in stress scenes - walks from room to room along
+	paths found through the dungeon's room graph
+	'''
+	def __init__(self, dungeon, speed=5):
+		from navigation import HierarchicalPathfinder
+		self.pathfinder = HierarchicalPathfinder(dungeon.room_graph)
+		self.rooms = dungeon.rooms + [dungeon.start_room]
+		self.pos = [dungeon.start_room.centerx * TILE_SIZE, dungeon.start_room.centery * TILE_SIZE]
+		self.speed = speed
+		self.path = [] # centres of the cells left to walk through
+
+	def next_point(self, pos):
+		# next point to head for from pos, picking another room once the last is reached
+		while self.path and abs(self.path[0][0] - pos[0]) <= 4 and abs(self.path[0][1] - pos[1]) <= 4:
+			self.path.pop(0)
+		if not self.path:
+			room = random.choice(self.rooms)
+			path = self.pathfinder.find_path(pos, (room.centerx * TILE_SIZE, room.centery * TILE_SIZE))
+			self.path = [(col * TILE_SIZE + TILE_SIZE // 2, row * TILE_SIZE + TILE_SIZE // 2)
+				for col, row in path or []]
+		return self.path[0] if self.path else pos
+
+	def update(self):
+		# moves the stand in along the path itself
+		target = self.next_point(self.pos)
+		dx, dy = target[0] - self.pos[0], target[1] - self.pos[1]
+		distance = (dx*dx + dy*dy) ** 0.5
+		if distance <= self.speed:
+			self.pos = list(target)
+		else:
+			self.pos[0] += dx / distance * self.speed
+			self.pos[1] += dy / distance * self.speed
+
+	def interpolated_rect(self, alpha):
+		# where a camera group centres the view, as it would on the player
+		return pygame.Rect(self.pos[0], self.pos[1], 0, 0)
+
+
+def ecs_stress(count, ticks, seed, sprites=False):
+	# thousands of chasing, colliding, animated entities run through the ecs
+	# systems, with only those on screen drawn - by the render system, or if
+	# sprites is set, through an EntitySprite each in the dungeon's camera group
+	from dun_gen import get_dungeon
+	from collision import TileGrid
+	from ecs import World, EntitySprite, render_system
+	from camera import DungeonCameraGroup, StaticGroup
+
+	screen = setup()
+	clock = GameClock()
+	set_clock(clock)
+	random.seed(seed)
+	dungeon = get_dungeon()
+	grid = TileGrid(dungeon.tilemap)
+	world = World(grid)
+	player = PlayerPath(dungeon)
+	camera = DungeonCameraGroup(StaticGroup()) if sprites else None
+
+	frames = import_folder('graphics/enemy/move')
+	cells = floor_cells(grid, 'enemy')
+	for i in range(count):
+		x, y = random.choice(cells)
+		entity = world.create(
+			transform={'x': x, 'y': y, 'last_x': x, 'last_y': y},
+			velocity={'speed': ENEMY['speed']},
+			hitbox={'width': 24, 'height': 24, 'agent': 'enemy'},
+			animation={'frames': frames, 'start': random.random() * len(frames),
+				'speed': 0.2, 'depth': LAYERS['main']},
+			health={'value': ENEMY['health']},
+			cooldown={'duration': 800},
+			ai={'home_x': x, 'home_y': y, 'notice': ENEMY['caution radius'],
+				'reach': ENEMY['attack radius']})
+		if sprites:
+			EntitySprite(world, entity, camera)
+
+	update_stats = FrameStats()
+	draw_stats = FrameStats()
+	attacks = 0
+	for tick in range(ticks):
+		start = perf_counter()
+		clock.advance(TICK_TIME * 1000)
+		player.update()
+		world.target = player.pos
+		world.update()
+		attacks += sum(1 for event, entity in world.take_events() if event == 'attack')
+		drawn = perf_counter()
+
+		screen.fill(CYAN)
+		if sprites:
+			camera.custom_draw(player)
+		else:
+			offset = (player.pos[0] - SCREEN_WIDTH // 2, player.pos[1] - SCREEN_HEIGHT // 2)
+			render_system(world, screen, offset)
+		end = perf_counter()
+
+		update_stats.add(drawn - start)
+		draw_stats.add(end - drawn)
+
+	print(f'{count} entities{" (drawn as sprites)" if sprites else ""}, {ticks} ticks, '
+		f'{attacks} attacks on the player')
+	update_stats.display('update times')
+	draw_stats.display('draw times')
+	totals = sorted(update + draw for update, draw in zip(update_stats.times, draw_stats.times))
+	p95 = update_stats.percentile(totals, 95)
+	print(f'p95 update + draw: {p95 * 1000:.2f}ms '
+		f'({"within" if p95 <= TICK_TIME else "over"} a {TICK_RATE} fps frame)')
+
+
+class ClearSight:
+	'''
+	line of sight which walls never block, so that every enemy can be aggroed at once
+	'''
+	def new_frame(self):
+		pass
+
+	def can_see(self, start, end):
+		return True
+
+
+def path_input(state):
+	# input source which walks the real player along a PlayerPath, swinging its
+	# sword every so often, and finds a new path whenever the player gets stuck
+	from controls import InputSource, UP, DOWN, LEFT, RIGHT, SWORD
+
+	class PathInput(InputSource):
+		def __init__(self):
+			super().__init__()
+			self.path = PlayerPath(state.dungeon)
+			self.ticks = 0
+			self.last_pos = None
+			self.stuck = 0
+
+		def read(self):
+			self.ticks += 1
+			pos = state.player.hitbox.center
+			self.stuck = self.stuck + 1 if pos == self.last_pos else 0
+			self.last_pos = pos
+			if self.stuck > 30:
+				self.path.path = []
+				self.stuck = 0
+
+			target = self.path.next_point(pos)
+			bits = SWORD if self.ticks % 45 == 0 else 0
+			if target[0] - pos[0] > 3:
+				bits |= RIGHT
+			elif target[0] - pos[0] < -3:
+				bits |= LEFT
+			if target[1] - pos[1] > 3:
+				bits |= DOWN
+			elif target[1] - pos[1] < -3:
+				bits |= UP
+			return bits
+
+	return PathInput()
+
+
+def still_input():
+	# input source which never presses anything, so the player stands at the spawn
+	from controls import InputSource
+
+	class StillInput(InputSource):
+		def read(self):
+			return 0
+
+	return StillInput()
+
+
+def density(mob_counts, width, height, ticks, seed, aggro, still=False):
+	# runs the real dungeon with more and more mobs in each room, with the player
+	# walked around automatically (or left standing still, so enemies away from
+	# the start room never wake), to show how each part of a tick scales
+	import tracemalloc
+	import controls
+	from states import DungeonState
+	from player_store import TempStore
+
+	setup()
+	print(f'{width}x{height} map, {ticks} ticks per run' + (', all enemies aggroed' if aggro else '')
+		+ (', player standing still' if still else ''))
+	print(f'{"mobs/room":>9}{"enemies":>9}{"memory":>9}{"ai p95":>9}{"update p95":>12}'
+		f'{"draw p95":>10}{"frame p50":>11}{"frame p95":>11}{"frame p99":>11}{"deferred":>10}')
+
+	for mobs in mob_counts:
+		clock = GameClock()
+		set_clock(clock)
+		random.seed(seed)
+		state = DungeonState()
+		state.dungeon_options = {'width': width, 'height': height, 'mobs_per_room': mobs}
+		tracemalloc.start()
+		state.new(TempStore())
+		memory = tracemalloc.get_traced_memory()[0]
+		tracemalloc.stop()
+		if aggro:
+			# every enemy notices the player from anywhere, and walls don't block their view
+			state.enemy_batch.ctn_radius = float('inf')
+			state.enemy_batch.sight = ClearSight()
+		controls.set_input(still_input() if still else path_input(state))
+		enemies = len(state.enemy_sprites)
+
+		# times the enemy ai on its own, as part of each update
+		ai_stats = FrameStats()
+		ai_update = state.enemy_ai.update
+		def timed_ai(player):
+			start = perf_counter()
+			ai_update(player)
+			ai_stats.add(perf_counter() - start)
+		state.enemy_ai.update = timed_ai
+
+		update_stats, draw_stats, frame_stats = FrameStats(), FrameStats(), FrameStats()
+		for tick in range(ticks):
+			start = perf_counter()
+			controls.poll()
+			clock.advance(TICK_TIME * 1000)
+			state.update()
+			updated = perf_counter()
+			state.draw()
+			end = perf_counter()
+			update_stats.add(updated - start)
+			draw_stats.add(end - updated)
+			frame_stats.add(end - start)
+			state.player.health = state.player.stats['health'] # the player can't die mid run
+
+		def ms(stats, percent):
+			return f'{stats.percentile(sorted(stats.times), percent) * 1000:.2f}'
+		print(f'{mobs:>9}{enemies:>9}{memory / 2**20:>8.1f}M{ms(ai_stats, 95):>9}{ms(update_stats, 95):>12}'
+			f'{ms(draw_stats, 95):>10}{ms(frame_stats, 50):>11}{ms(frame_stats, 95):>11}'
+			f'{ms(frame_stats, 99):>11}{state.enemy_ai.deferrals:>10}')
+
+
+def measure(build):
+	# time taken, memory still allocated and python objects created by build()
+	import gc
+	import tracemalloc
+	gc.collect()
+	objects = len(gc.get_objects())
+	tracemalloc.start()
+	start = perf_counter()
+	result = build()
+	taken = perf_counter() - start
+	memory = tracemalloc.get_traced_memory()[0]
+	tracemalloc.stop()
+	gc.collect()
+	return result, taken, memory, len(gc.get_objects()) - objects
+
+
+def tile_memory(scale, seed):
+	# compares a sprite for every tile (how dungeon tiles used to be stored)
+	# against tile layers, for a dungeon repeated scale times in each direction
+	from dun_gen import get_dungeon
+	from sprites import Tile, TileSheet, TileLayer
+	from camera import StaticGroup
+
+	setup()
+	random.seed(seed)
+	tilemap = [row * scale for row in get_dungeon().tilemap] * scale
+	tile_set = TileSheet('graphics/level/tiles.png')
+
+	def tile_image(tile):
+		# wall or floor image for a tile, and the depth it's drawn at
+		if isinstance(tile, int):
+			return tile_set.get_image(TILE_VALUES['edge' if tile <= 31 else 'plain']), LAYERS['main']
+		if tile[0] == 'D':
+			return tile_set.get_image(TILE_VALUES[tile[1:]]), LAYERS['floor']
+		return tile_set.get_image(TILE_VALUES['floor']), LAYERS['floor']
+
+	def build_sprites():
+		group = StaticGroup()
+		for row, tiles in enumerate(tilemap):
+			for col, tile in enumerate(tiles):
+				image, depth = tile_image(tile)
+				# each tile used to get its own subsurface of the sheet
+				image = image.get_parent().subsurface(image.get_offset(), image.get_size())
+				Tile((col * TILE_SIZE, row * TILE_SIZE), image, group, depth)
+		return group
+
+	def build_layers():
+		floor = TileLayer(len(tilemap[0]), len(tilemap), LAYERS['floor'])
+		walls = TileLayer(len(tilemap[0]), len(tilemap), LAYERS['main'])
+		for row, tiles in enumerate(tilemap):
+			for col, tile in enumerate(tiles):
+				image, depth = tile_image(tile)
+				(walls if depth == LAYERS['main'] else floor).set_tile(col, row, image)
+		return floor, walls
+
+	print(f'{len(tilemap[0])}x{len(tilemap)} tiles')
+	print(f'{"":<16}{"time (ms)":>12}{"memory (kb)":>14}{"objects":>10}')
+	for name, build in (('sprite per tile', build_sprites), ('tile layers', build_layers)):
+		result, taken, memory, objects = measure(build)
+		print(f'{name:<16}{taken * 1000:>12.1f}{memory / 1024:>14.1f}{objects:>10}')
+		del result
+
+
+if __name__ == '__main__':
+	parser = ArgumentParser()
+	subparsers = parser.add_subparsers(dest='benchmark', required=True)
+	ecs = subparsers.add_parser('ecs', help='stress scene of entities run through the ecs')
+	ecs.add_argument('--count', type=int, default=3000, help='number of entities')
+	ecs.add_argument('--ticks', type=int, default=600, help='number of ticks to run')
+	ecs.add_argument('--seed', type=int, default=0, help='seed for the dungeon layout and spawns')
+	ecs.add_argument('--sprites', action='store_true',
+		help='draw entities through sprite adapters and the camera group, as a state would')
+	tiles = subparsers.add_parser('tiles', help='memory and build time of dungeon tiles')
+	tiles.add_argument('--scale', type=int, default=1, help='repeats the dungeon this many times each way')
+	tiles.add_argument('--seed', type=int, default=0, help='seed for the dungeon layout')
+	stress = subparsers.add_parser('density', help='the dungeon with more and more mobs per room')
+	stress.add_argument('--mobs', type=int, nargs='+', default=[1, 5, 10, 20, 40],
+		help='mobs per room for each run')
+	stress.add_argument('--size', type=int, nargs=2, default=[MAP_WIDTH, MAP_HEIGHT],
+		metavar=('WIDTH', 'HEIGHT'), help='map size in tiles')
+	stress.add_argument('--ticks', type=int, default=600, help='number of ticks in each run')
+	stress.add_argument('--seed', type=int, default=0, help='seed for the dungeon layout and spawns')
+	stress.add_argument('--aggro', action='store_true', help='every enemy chases the player at once')
+	stress.add_argument('--still', action='store_true', help='the player stands still at the spawn')
+	args = parser.parse_args()
+
+	if args.benchmark == 'ecs':
+		ecs_stress(args.count, args.ticks, args.seed, args.sprites)
+	elif args.benchmark == 'tiles':
+		tile_memory(args.scale, args.seed)
+	elif args.benchmark == 'density':
+		density(args.mobs, *args.size, args.ticks, args.seed, args.aggro, args.still)
+	pygame.quit()
@@ -13,17 +13,17 @@ class Button(pygame.sprite.Sprite):
 
 	def set_image(self,path,hover):
 		# sets the button's image and its equivalent hover image
-		self.image = pygame.image.load(path + '.png').convert_alpha()
+		self.image = load_image(path + '.png')
 		self.temp_image = self.image
 		if hover:
 			# if the button changes when hovered over, set a different hover image
-			self.hover_image = pygame.image.load(path + '_hover.png').convert_alpha()
+			self.hover_image = load_image(path + '_hover.png')
 		else:
 			self.hover_image = self.image
 
 	def create_text(self,text,colour,text_size,pos):
 		# creates and renders the text for the button
-		self.font = pygame.font.Font(UI_FONT, text_size)
+		self.font = get_font(text_size)
 		self.text_surf = self.font.render(text, True, colour)
 		self.text_rect = self.text_surf.get_rect(center=pos)
 
@@ -83,17 +83,22 @@ class UpgradeButton(Button):
 		self.text = text
 		self.type = text
 		self.hover_data = text
+
+		# text in both colours made up front, rather than on every hover check
+		self.create_text(text,CYAN,TEXT_S,(self.rect.centerx,508))
+		self.hover_text_surf = self.text_surf
 		self.create_text(text,WHITE,TEXT_S,(self.rect.centerx,508))
+		self.temp_text_surf = self.text_surf
 
 	def on_hover(self,mouse_pos):
 		# custom hover, changes button's text colour so text can still be seen when hovering
 		if self.rect.collidepoint(mouse_pos):
 			self.image = self.hover_image
-			self.create_text(self.text,CYAN,TEXT_S,(self.rect.centerx,508))
+			self.text_surf = self.hover_text_surf
 			return True
 		else:
 			self.image = self.temp_image
-			self.create_text(self.text,WHITE,TEXT_S,(self.rect.centerx,508))
+			self.text_surf = self.temp_text_surf
 			return False
 
 
@@ -1,44 +1,89 @@
 import pygame
+from heapq import merge
 
 from settings import *
 
+def draw_order(sprite):
+	# sprites are sorted by their depth (layer), then by their y position
+	return (sprite.depth, sprite.rect.centery)
+
+
+def draw_rect(sprite, alpha):
+	# moving entities (and ecs entities shown through a sprite) are drawn between
+	# their previous and current positions
+	if hasattr(sprite, 'interpolated_rect'):
+		return sprite.interpolated_rect(alpha)
+	return sprite.rect
+
+
+class StaticGroup(pygame.sprite.Group):
+	'''
+	group for sprites that never move or animate - they are drawn but never
+	updated, so their draw order only needs sorting again when the group changes
+	'''
+	def __init__(self, *sprites):
+		self.sorted_sprites = None
+		super().__init__(*sprites)
+
+	def add_internal(self, sprite, layer=None):
+		super().add_internal(sprite, layer)
+		self.sorted_sprites = None
+
+	def remove_internal(self, sprite):
+		super().remove_internal(sprite)
+		self.sorted_sprites = None
+
+	def get_sorted(self):
+		# returns sprites in draw order, only sorting when sprites have been added/removed
+		if self.sorted_sprites is None:
+			self.sorted_sprites = sorted(self.sprites(), key=draw_order)
+		return self.sorted_sprites
+
+
 class DungeonCameraGroup(pygame.sprite.Group):
 	'''
 	aligns view with player - player character always in centre of screen
 	'''
-	def __init__(self):
+	def __init__(self, static_sprites, tile_layers=()):
 		super().__init__()
 		self.display_surf = pygame.display.get_surface()
 		self.offset = pygame.math.Vector2()
+		self.static_sprites = static_sprites	# sprites that never move, drawn alongside this group's sprites
+		self.tile_layers = tile_layers 			# floor and walls, drawn a row at a time
 
-	def custom_draw(self, player):
+	def custom_draw(self, player, alpha=1):
 		# centers player in middle of the screen at all times
 
 		# calculates distance between player center and display surface center
-		self.offset.x = player.rect.centerx - (SCREEN_WIDTH // 2)
-		self.offset.y = player.rect.centery - (SCREEN_HEIGHT // 2)
-
-		for sprite in sorted(self.sprites(), 
-			key=lambda sprite: (sprite.depth, sprite.rect.centery)):
-			# sorts sprites by their depth (layer), then by their y position
-			offset_pos = sprite.rect.topleft - self.offset
-			self.display_surf.blit(sprite.image, offset_pos)
-			# everything but player is moved when player moves, offset used to move everything else
-
-	def enemy_update(self, player):
-		# calls update method for all enemies in relation to player
-		enemy_sprites = [sprite for sprite in self.sprites() if hasattr(
-			sprite, 'type') and sprite.type == 'enemy'] # creates list of enemy sprites
-		for enemy in enemy_sprites:
-			enemy.enemy_update(player)
-			if enemy.aoe_attack:
-				# if enemy sprite currently has an attack sprite of its own
-				if enemy.state == 'attack_prepare':
-					# and is preparing the attack, then continue updating the attack
-					enemy.aoe_attack.update_alpha()
-				else:
-					# and is not attacking, then remove the attack sprite
-					enemy.aoe_attack.kill()
+		player_rect = player.interpolated_rect(alpha)
+		self.offset.x = player_rect.centerx - (SCREEN_WIDTH // 2)
+		self.offset.y = player_rect.centery - (SCREEN_HEIGHT // 2)
+
+		# each visible row of a tile layer is sorted as if it were a sprite in the
+		# middle of the row, so walls still overlap the player properly
+		rows = []
+		for layer in self.tile_layers:
+			visible_rows, cols = layer.visible(self.offset)
+			rows.append([((layer.depth, row * TILE_SIZE + TILE_SIZE // 2), layer, row, cols)
+				for row in visible_rows])
+
+		# sprites off screen (by more than a tile, which covers how far a sprite is drawn
+		# from its rect) are skipped before sorting, so their images are never worked out
+		view = pygame.Rect(self.offset.x - TILE_SIZE, self.offset.y - TILE_SIZE,
+			SCREEN_WIDTH + TILE_SIZE * 2, SCREEN_HEIGHT + TILE_SIZE * 2)
+		static = [sprite for sprite in self.static_sprites.get_sorted() if view.colliderect(sprite.rect)]
+		moving = [sprite for sprite in self.sprites() if view.colliderect(sprite.rect)]
+		sprites = [(draw_order(sprite), None, sprite, None) for sprite in merge(
+			static, sorted(moving, key=draw_order), key=draw_order)]
+
+		for order, layer, item, cols in merge(*rows, sprites, key=lambda entry: entry[0]):
+			# already sorted tile rows and static sprites merged with the sorted moving
+			# sprites, so nothing static is re-sorted every frame
+			if layer:
+				layer.draw_row(self.display_surf, item, cols, self.offset)
+			else:
+				offset_pos = draw_rect(item, alpha).topleft - self.offset
+				self.display_surf.blit(item.image, offset_pos)
 
 
 class ForestCameraGroup(pygame.sprite.Group):
@@ -50,13 +95,11 @@ class ForestCameraGroup(pygame.sprite.Group):
 		self.display_surf = pygame.display.get_surface()
 
 		# uses a set background image, unlike the dungeon which uses only tiles
-		self.floor_surf = pygame.image.load('graphics/level/forestmap.png').convert()
+		self.floor_surf = load_image('graphics/level/forestmap.png', alpha=False)
 		self.floor_rect = self.floor_surf.get_rect(topleft=(0,0))	
 
-	def custom_draw(self, player):
+	def custom_draw(self, player, alpha=1):
 		# screen does not move when player moves
 		self.display_surf.blit(self.floor_surf,self.floor_rect)
-		player.hitbox.clamp_ip(self.floor_rect)	# player cannot go out of bounds
-		for sprite in sorted(self.sprites(), 
-			key=lambda sprite: (sprite.depth, sprite.rect.centery)):
-			self.display_surf.blit(sprite.image, sprite.rect)
\ No newline at end of file
+		for sprite in sorted(self.sprites(), key=draw_order):
+			self.display_surf.blit(sprite.image, draw_rect(sprite, alpha))
\ No newline at end of file
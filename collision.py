@@ -0,0 +1,320 @@
+import pygame
+
+from settings import *
+
+def sweep_rect(collider, rect, dx, dy):
+	# moves a copy of the rect by (dx, dy), stopping it against the first obstacle in
+	# its way rather than moving it and pushing it back out afterwards, so that fast
+	# movement cannot pass through walls. returns the moved rect, and the normal of
+	# any surface it was stopped by (0 on an axis where it wasn't stopped)
+	target = rect.copy()
+	target.x += dx
+	target.y += dy
+	dx = target.x - rect.x # movement rounded the same way as moving the rect would
+	dy = target.y - rect.y
+
+	# movement split into steps of at most half a tile, so diagonal movement follows
+	# its line rather than going the full distance along x before y
+	steps = max(1, -(-max(abs(dx), abs(dy)) // (TILE_SIZE // 2)))
+	moved = rect.copy()
+	normal_x = normal_y = 0
+	for step in range(1, steps + 1):
+		step_x = dx * step // steps - dx * (step - 1) // steps
+		step_y = dy * step // steps - dy * (step - 1) // steps
+		# once stopped on an axis, only slides along the other
+		if step_x and not normal_x:
+			normal_x = collider.sweep_x(moved, step_x)
+		if step_y and not normal_y:
+			normal_y = collider.sweep_y(moved, step_y)
+	return moved, (normal_x, normal_y)
+
+
+class SpatialHashGroup(pygame.sprite.Group):
+	'''
+	sprite group which also files each sprite under every tile-sized cell that
+	its hitbox covers, so that only the sprites near a rect need to be checked
+	(rather than every sprite in the group)
+	'''
+	def __init__(self, *sprites, rect_attr='hitbox'):
+		self.rect_attr = rect_attr 	# which of the sprite's rects is indexed
+		self.cells = {}				# (col, row) cell -> set of sprites within that cell
+		self.sprite_cells = {}		# sprite -> cells the sprite is currently filed under
+		super().__init__(*sprites)
+
+	def get_cells(self, rect):
+		# returns every cell that the rect covers
+		left = rect.left // TILE_SIZE
+		right = (rect.right - 1) // TILE_SIZE
+		top = rect.top // TILE_SIZE
+		bottom = (rect.bottom - 1) // TILE_SIZE
+		return [(col, row) for row in range(top, bottom + 1)
+			for col in range(left, right + 1)]
+
+	def add_internal(self, sprite, layer=None):
+		super().add_internal(sprite, layer)
+		cells = self.get_cells(getattr(sprite, self.rect_attr))
+		for cell in cells:
+			self.cells.setdefault(cell, set()).add(sprite)
+		self.sprite_cells[sprite] = cells
+
+	def remove_internal(self, sprite):
+		super().remove_internal(sprite)
+		for cell in self.sprite_cells.pop(sprite):
+			self.cells[cell].discard(sprite)
+
+	def relocate(self, sprite):
+		# refiles a sprite which has moved under the cells it now covers
+		cells = self.get_cells(getattr(sprite, self.rect_attr))
+		if cells != self.sprite_cells[sprite]:
+			for cell in self.sprite_cells[sprite]:
+				self.cells[cell].discard(sprite)
+			for cell in cells:
+				self.cells.setdefault(cell, set()).add(sprite)
+			self.sprite_cells[sprite] = cells
+
+	def collide(self, rect):
+		# returns the sprites near the rect which actually overlap it
+		return [sprite for sprite in self.near(rect)
+			if getattr(sprite, self.rect_attr).colliderect(rect)]
+
+	def near(self, rect):
+		# returns the sprites filed under any of the cells the rect covers
+		found = set()
+		for cell in self.get_cells(rect):
+			if cell in self.cells:
+				found.update(self.cells[cell])
+		return found
+
+	def colliders(self, rect):
+		# returns the hitboxes of the sprites near the rect
+		return [getattr(sprite, self.rect_attr) for sprite in self.near(rect)]
+
+	def sweep(self, rect, dx, dy):
+		return sweep_rect(self, rect, dx, dy)
+
+	def sweep_x(self, rect, dx):
+		# moves rect along x up to the nearest hitbox in the way, returns the normal
+		ahead = [hitbox for hitbox in self.colliders(rect.union(rect.move(dx, 0)))
+			if hitbox.top < rect.bottom and hitbox.bottom > rect.top]
+		if dx > 0:
+			ahead = [hitbox.left for hitbox in ahead if rect.right <= hitbox.left < rect.right + dx]
+			if ahead:
+				rect.right = min(ahead)
+				return -1
+		else:
+			ahead = [hitbox.right for hitbox in ahead if rect.left >= hitbox.right > rect.left + dx]
+			if ahead:
+				rect.left = max(ahead)
+				return 1
+		rect.x += dx
+		return 0
+
+	def sweep_y(self, rect, dy):
+		# moves rect along y up to the nearest hitbox in the way, returns the normal
+		ahead = [hitbox for hitbox in self.colliders(rect.union(rect.move(0, dy)))
+			if hitbox.left < rect.right and hitbox.right > rect.left]
+		if dy > 0:
+			ahead = [hitbox.top for hitbox in ahead if rect.bottom <= hitbox.top < rect.bottom + dy]
+			if ahead:
+				rect.bottom = min(ahead)
+				return -1
+		else:
+			ahead = [hitbox.bottom for hitbox in ahead if rect.top >= hitbox.bottom > rect.top + dy]
+			if ahead:
+				rect.top = max(ahead)
+				return 1
+		rect.y += dy
+		return 0
+
+
+# cell flags used by TileGrid
+WALL = 1
+CORRIDOR = 2
+
+# which cells block each kind of agent - enemies cannot walk down corridors,
+# so cannot follow the player out of the room they are in
+BLOCKING = {
+	'player': WALL,
+	'enemy': WALL | CORRIDOR}
+
+WALL_INSET = 5 # blocking area of a cell is shrunk top and bottom, so sprites can overlap walls slightly
+
+
+class TileGrid:
+	'''
+	collision map read directly from the dungeon tilemap - each cell stores flags
+	for what kind of tile it is, so collision checks only look at the cells a rect
+	covers and no sprite is needed for each wall
+	'''
+	def __init__(self, tilemap):
+		self.height = len(tilemap)
+		self.width = len(tilemap[0])
+		self.cells = bytearray(self.width * self.height)
+
+		for y, row in enumerate(tilemap):
+			for x, tile in enumerate(row):
+				if isinstance(tile, int):
+					# wall tiles are given their value as an int by DungeonMap
+					self.cells[y * self.width + x] = WALL
+				elif tile[0] == 'c':
+					self.cells[y * self.width + x] = CORRIDOR
+
+	def get_flags(self, col, row):
+		# returns the flags of a cell - anything outside the map counts as wall
+		if 0 <= col < self.width and 0 <= row < self.height:
+			return self.cells[row * self.width + col]
+		return WALL
+
+	def cell_rect(self, col, row):
+		# area of a cell which blocks movement (matching the hitbox a wall Tile would have)
+		return pygame.Rect(col * TILE_SIZE, row * TILE_SIZE + WALL_INSET,
+			TILE_SIZE, TILE_SIZE - WALL_INSET*2)
+
+	def colliders(self, rect, agent='player'):
+		# returns the blocking areas of every blocked cell that the rect overlaps
+		blocking = BLOCKING[agent]
+		found = []
+		for row in range(rect.top // TILE_SIZE, (rect.bottom - 1) // TILE_SIZE + 1):
+			for col in range(rect.left // TILE_SIZE, (rect.right - 1) // TILE_SIZE + 1):
+				if self.get_flags(col, row) & blocking:
+					cell = self.cell_rect(col, row)
+					if cell.colliderect(rect):
+						found.append(cell)
+		return found
+
+	def blocked(self, rect, agent='player'):
+		# checks if the rect overlaps any cell that blocks the agent
+		return bool(self.colliders(rect, agent))
+
+	def sweep(self, rect, dx, dy, agent='player'):
+		return sweep_rect(self.for_agent(agent), rect, dx, dy)
+
+	def sweep_x(self, rect, dx, agent='player'):
+		# moves rect along x, checking only the columns its leading edge crosses
+		# (in the rows it covers) and stopping at the first blocked one
+		blocking = BLOCKING[agent]
+		rows = [row for row in range(rect.top // TILE_SIZE, (rect.bottom - 1) // TILE_SIZE + 1)
+			if rect.top < (row + 1) * TILE_SIZE - WALL_INSET and rect.bottom > row * TILE_SIZE + WALL_INSET]
+
+		if dx > 0:
+			for col in range((rect.right - 1) // TILE_SIZE + 1, (rect.right + dx - 1) // TILE_SIZE + 1):
+				if any(self.get_flags(col, row) & blocking for row in rows):
+					rect.right = col * TILE_SIZE
+					return -1
+		else:
+			for col in range(rect.left // TILE_SIZE - 1, (rect.left + dx) // TILE_SIZE - 1, -1):
+				if any(self.get_flags(col, row) & blocking for row in rows):
+					rect.left = (col + 1) * TILE_SIZE
+					return 1
+		rect.x += dx
+		return 0
+
+	def sweep_y(self, rect, dy, agent='player'):
+		# moves rect along y, checking only the rows whose blocking area its leading
+		# edge crosses (in the columns it covers) and stopping at the first blocked one
+		blocking = BLOCKING[agent]
+		cols = range(rect.left // TILE_SIZE, (rect.right - 1) // TILE_SIZE + 1)
+
+		if dy > 0:
+			first = -(-(rect.bottom - WALL_INSET) // TILE_SIZE)
+			last = (rect.bottom + dy - WALL_INSET - 1) // TILE_SIZE
+			for row in range(first, last + 1):
+				if any(self.get_flags(col, row) & blocking for col in cols):
+					rect.bottom = row * TILE_SIZE + WALL_INSET
+					return -1
+		else:
+			first = (rect.top - TILE_SIZE + WALL_INSET) // TILE_SIZE
+			last = (rect.top + dy - TILE_SIZE + WALL_INSET) // TILE_SIZE + 1
+			for row in range(first, last - 1, -1):
+				if any(self.get_flags(col, row) & blocking for col in cols):
+					rect.top = (row + 1) * TILE_SIZE - WALL_INSET
+					return 1
+		rect.y += dy
+		return 0
+
+	def for_agent(self, agent):
+		# collision map for a single kind of agent, used by entities
+		return GridCollider(self, agent)
+
+
+class GridCollider:
+	'''
+	a TileGrid as seen by one kind of agent (player or enemy)
+	'''
+	def __init__(self, grid, agent):
+		self.grid = grid
+		self.agent = agent
+
+	def colliders(self, rect):
+		return self.grid.colliders(rect, self.agent)
+
+	def blocked(self, rect):
+		return self.grid.blocked(rect, self.agent)
+
+	def sweep(self, rect, dx, dy):
+		return sweep_rect(self, rect, dx, dy)
+
+	def sweep_x(self, rect, dx):
+		return self.grid.sweep_x(rect, dx, self.agent)
+
+	def sweep_y(self, rect, dy):
+		return self.grid.sweep_y(rect, dy, self.agent)
+
+
+class LineOfSight:
+	'''
+	checks if one point can be seen from another by walking the cells of a
+	TileGrid along the line between them, stopping at the first blocked cell.
+	results are remembered until the next frame, so enemies stood in the same
+	cell only need one check between them
+	'''
+	def __init__(self, grid, agent='enemy'):
+		self.grid = grid
+		self.agent = agent
+		self.results = {} 	# (start cell, end cell) -> whether the end can be seen
+
+	def new_frame(self):
+		# positions have changed, so previous results can no longer be used
+		self.results.clear()
+
+	def can_see(self, start, end):
+		# checks if the line between two pixel positions is clear of blocked cells
+		start_cell = (int(start[0]) // TILE_SIZE, int(start[1]) // TILE_SIZE)
+		end_cell = (int(end[0]) // TILE_SIZE, int(end[1]) // TILE_SIZE)
+		key = (start_cell, end_cell)
+		if key not in self.results:
+			self.results[key] = self.trace(start_cell, end_cell)
+		return self.results[key]
+
+	def trace(self, start_cell, end_cell):
+		# steps cell by cell along the line between the centres of two cells,
+		# visiting every cell the line passes through (only cells along the line
+		# are checked, so cost depends on distance rather than number of walls)
+		blocking = BLOCKING[self.agent]
+		col, row = start_cell
+		diff_x = end_cell[0] - col
+		diff_y = end_cell[1] - row
+		steps_x, steps_y = abs(diff_x), abs(diff_y)
+		step_x = 1 if diff_x > 0 else -1
+		step_y = 1 if diff_y > 0 else -1
+
+		taken_x = taken_y = 0
+		while taken_x < steps_x or taken_y < steps_y:
+			# compares where the line next crosses a vertical and horizontal cell edge
+			crossing = (1 + 2*taken_x) * steps_y - (1 + 2*taken_y) * steps_x
+			if crossing == 0:
+				# line passes exactly through a corner, goes diagonally
+				col += step_x
+				row += step_y
+				taken_x += 1
+				taken_y += 1
+			elif crossing < 0:
+				col += step_x
+				taken_x += 1
+			else:
+				row += step_y
+				taken_y += 1
+
+			if self.grid.get_flags(col, row) & blocking:
+				return False
+		return True
@@ -0,0 +1,75 @@
+import pygame
+
+# each control the player can use, as a bit in a tick's input
+UP = 1
+DOWN = 2
+LEFT = 4
+RIGHT = 8
+DASH = 16
+INTERACT = 32
+SWORD = 64
+MAGIC = 128
+
+# keys mapped to the controls they press
+KEY_CONTROLS = {
+	pygame.K_w: UP,
+	pygame.K_s: DOWN,
+	pygame.K_a: LEFT,
+	pygame.K_d: RIGHT,
+	pygame.K_SPACE: DASH,
+	pygame.K_f: INTERACT}
+
+
+class InputSource:
+	'''
+	reads the keyboard and mouse once per tick and packs the controls being held
+	into a single int, so every sprite sees the same input for the whole tick
+	(and so that input can be recorded and replayed)
+	'''
+	def __init__(self):
+		self.bits = 0 		# controls held this tick
+		self.last_bits = 0 	# controls held last tick
+		self.finished = False 	# set once a source has no more input to give (e.g. end of a replay)
+
+	def read(self):
+		# gets the controls currently being held
+		keys = pygame.key.get_pressed()
+		mouse = pygame.mouse.get_pressed()
+		bits = 0
+		for key, control in KEY_CONTROLS.items():
+			if keys[key]:
+				bits |= control
+		if mouse[0]:
+			bits |= SWORD
+		if mouse[2]:
+			bits |= MAGIC
+		return bits
+
+	def poll(self):
+		# called by the game loop at the start of each tick
+		self.last_bits = self.bits
+		self.bits = self.read()
+
+	def held(self, control):
+		return bool(self.bits & control)
+
+	def pressed(self, control):
+		# only true on the tick that the control starts being held
+		return bool(self.bits & control) and not self.last_bits & control
+
+
+source = InputSource() # input source currently in use
+
+def set_input(new_source):
+	# swaps where the player's input comes from (e.g. a replay)
+	global source
+	source = new_source
+
+def poll():
+	source.poll()
+
+def held(control):
+	return source.held(control)
+
+def pressed(control):
+	return source.pressed(control)
@@ -19,15 +19,17 @@ class BSPTree:
 	'''
 	tree of rects created to represent dungeon map
 	'''
-	def __init__(self,tree=None):
+	def __init__(self,tree=None,width=MAP_WIDTH,height=MAP_HEIGHT):
 		self.tree = tree
+		self.width = width 		# size of the map, in tiles
+		self.height = height
 		self.leaf_node_rects = []
 		self.MIN_NODE_SIZE = 16 # smallest split that can be made
 		self.create_tree()
 
 	def create_tree(self):
 		# creates main rect which entire tree (dungeon) is within
-		map_rect = pygame.Rect((0,0),(MAP_WIDTH,MAP_HEIGHT))
+		map_rect = pygame.Rect((0,0),(self.width,self.height))
 		self.tree = self.split_tree(map_rect)
 
 	def split_tree(self,rect):
@@ -99,8 +101,10 @@ class Tilemap:
 	creates 2D array (tilemap) of dungeon based on tree data created by BSPTree
 	to be used when blitting tiles to screen
 	'''
-	def __init__(self,map_tree,leaf_nodes):
+	def __init__(self,map_tree,leaf_nodes,width=MAP_WIDTH,height=MAP_HEIGHT):
 		self.map_tree = map_tree		# holds rect data of every node
+		self.width = width 				# size of the map, in tiles
+		self.height = height
 		self.leaf_nodes = leaf_nodes 	# holds rect data of nodes which will have rooms
 		self.tilemap = [] 				# 2D array for tile values
 		self.rooms = []					# list holding rect data of every room
@@ -122,8 +126,8 @@ class Tilemap:
 
 	def create_empty_tilemap(self):
 		# all tiles initially set to wall tiles
-		self.tilemap = [['0' for x in range(MAP_WIDTH)]
-						for y in range(MAP_HEIGHT)]
+		self.tilemap = [['0' for x in range(self.width)]
+						for y in range(self.height)]
 		return self.tilemap
 
 	def draw_tilemap(self):
@@ -140,6 +144,7 @@ class Tilemap:
 
 		self.draw_corridors(self.map_tree)
 		self.erode()
+		self.room_graph = RoomGraph(self.tilemap)
 		self.rooms.remove(self.smallest_room) # so mobs cannot be placed into spawn room
 
 	def draw_room(self, rect):
@@ -222,12 +227,12 @@ class Tilemap:
 	def erode(self):
 		# deteriorates rooms and corridors, making them look less uniform
 
-		for walker in range(MAP_WIDTH*(MAP_HEIGHT//2)):
+		for walker in range(self.width*(self.height//2)):
 			self.reset_weighting() # resets any prior walker weighting
 
 			# chooses random coordinate position for walker to begin at
-			rand_y = random.randrange(1, MAP_HEIGHT)
-			rand_x = random.randrange(1, MAP_WIDTH)
+			rand_y = random.randrange(1, self.height)
+			rand_x = random.randrange(1, self.width)
 
 			if self.tile_check(rand_y,rand_x):
 				walker_life = random.randint(1,3)
@@ -240,7 +245,7 @@ class Tilemap:
 
 					# checking that next move is not out of bounds
 					while (move_y <= 0) or (move_x <= 0) or (
-						move_y >= MAP_HEIGHT - 1) or (move_x >= MAP_WIDTH - 1):
+						move_y >= self.height - 1) or (move_x >= self.width - 1):
 						move_y, move_x = self.walker_dir(rand_y,rand_x)
 
 					# checking if walker has hit an empty tile
@@ -307,18 +312,96 @@ class Tilemap:
 		self.north, self.east, self.south, self.west = 1.0, 1.0, 1.0, 1.0
 
 
+class RoomGraph:
+	'''
+	splits the walkable tiles of a tilemap into regions (rooms and corridors),
+	and links regions that touch through the pairs of tiles where they meet
+	(portals). used for long range pathfinding and for finding which room a
+	tile belongs to
+	'''
+	def __init__(self, tilemap):
+		self.width = len(tilemap[0])
+		self.height = len(tilemap)
+		self.regions = [-1] * (self.width * self.height) 	# region of each tile, -1 for walls
+		self.region_tiles = [] 	# tiles (x, y) in each region
+		self.is_corridor = [] 	# whether each region is a corridor
+		self.centres = [] 		# tile closest to the middle of each region
+		self.portals = [] 		# for each region, {neighbour region: (tile in region, tile in neighbour)}
+
+		self.find_regions(tilemap)
+		self.find_portals()
+
+	def find_regions(self, tilemap):
+		# flood fills each group of connected floor tiles, and each group of connected
+		# corridor tiles - eroded floor next to a corridor is counted as floor
+		for y in range(self.height):
+			for x in range(self.width):
+				tile = tilemap[y][x]
+				if tile == '0' or self.regions[y * self.width + x] != -1:
+					continue
+				corridor = tile == 'c'
+				region = len(self.region_tiles)
+				tiles = []
+				stack = [(x, y)]
+				self.regions[y * self.width + x] = region
+				while stack:
+					tile_x, tile_y = stack.pop()
+					tiles.append((tile_x, tile_y))
+					for next_x, next_y in ((tile_x+1, tile_y), (tile_x-1, tile_y),
+						(tile_x, tile_y+1), (tile_x, tile_y-1)):
+						if not (0 <= next_x < self.width and 0 <= next_y < self.height):
+							continue
+						next_tile = tilemap[next_y][next_x]
+						if (next_tile != '0' and (next_tile == 'c') == corridor and
+							self.regions[next_y * self.width + next_x] == -1):
+							self.regions[next_y * self.width + next_x] = region
+							stack.append((next_x, next_y))
+
+				self.region_tiles.append(tiles)
+				self.is_corridor.append(corridor)
+				mid_x = sum(tile[0] for tile in tiles) / len(tiles)
+				mid_y = sum(tile[1] for tile in tiles) / len(tiles)
+				self.centres.append(min(tiles,
+					key=lambda tile: (tile[0] - mid_x)**2 + (tile[1] - mid_y)**2))
+
+	def find_portals(self):
+		# every pair of touching tiles from different regions is a possible portal -
+		# the one in the middle of each border is kept
+		borders = [{} for region in self.region_tiles]
+		for region, tiles in enumerate(self.region_tiles):
+			for x, y in tiles:
+				for next_x, next_y in ((x+1, y), (x-1, y), (x, y+1), (x, y-1)):
+					neighbour = self.region_at(next_x, next_y)
+					if neighbour not in (-1, region):
+						borders[region].setdefault(neighbour, []).append(((x, y), (next_x, next_y)))
+
+		for border in borders:
+			self.portals.append({
+				neighbour: sorted(pairs)[len(pairs) // 2] for neighbour, pairs in border.items()})
+
+	def region_at(self, x, y):
+		# region of the tile at x, y, or -1 if it is a wall (or off the map)
+		if 0 <= x < self.width and 0 <= y < self.height:
+			return self.regions[y * self.width + x]
+		return -1
+
+
 class DungeonMap:
 	'''
 	takes tilemap produced by TileMap class and changes the values of each 'tile'
 	(item in the list) to ones which correspond with 
 	'''
-	def __init__(self, tilemap):
+	def __init__(self, tilemap, mobs_per_room=None):
 		# unpacking tilemap parameter
 		self.tilemap = tilemap.tilemap
+		self.width = tilemap.width
+		self.height = tilemap.height
+		self.mobs_per_room = mobs_per_room 	# exact number of mobs in each room, rather than 1-3
 		self.map_tree = tilemap.map_tree
 		self.leaf_nodes = tilemap.leaf_nodes
 		self.rooms = tilemap.rooms
 		self.start_room = tilemap.smallest_room
+		self.room_graph = tilemap.room_graph
 		self.player_spawn = self.start_room.center
 
 		# change floor terrain
@@ -340,7 +423,7 @@ class DungeonMap:
 	def generate_perlin(self, octaves):
 		# generates perlin noise image (2D list) of values resembling static
 		noise = PerlinNoise(octaves=octaves, seed=random.randint(0,100000))
-		x, y = MAP_WIDTH, MAP_HEIGHT
+		x, y = self.width, self.height
 		overlay = [[noise([i/x, j/y]) for j in range(x)] for i in range(y)]
 		return overlay
 
@@ -355,8 +438,8 @@ class DungeonMap:
 	def set_tile_vals(self,tile):
 		# gives each tile a value, calculated by checking surrounding tiles
 
-		for y in range(MAP_HEIGHT):
-			for x in range(MAP_WIDTH):
+		for y in range(self.height):
+			for x in range(self.width):
 				if self.tilemap_copy[y][x] == tile:
 					# looks at each of the 8 surrounding tiles around any given tile
 
@@ -400,6 +483,9 @@ class DungeonMap:
 
 	def place_mobs(self):
 		# places mobs onto tilemap overlay
+		if self.mobs_per_room is not None:
+			self.place_mob_count(self.mobs_per_room)
+			return
 		for room in self.rooms:
 			# each room must have at least one enemy
 			x = random.randint(room.x+1, room.x+room.width - 1)
@@ -412,6 +498,15 @@ class DungeonMap:
 					y = random.randint(room.y+1, room.y+room.height - 1)
 					self.tilemap_overlay[y][x] = 'M'
 
+	def place_mob_count(self, count):
+		# places the same number of mobs into every room (one per tile, so rooms
+		# can hold as many mobs as they have tiles)
+		for room in self.rooms:
+			tiles = [(x, y) for y in range(room.y+1, room.y+room.height)
+				for x in range(room.x+1, room.x+room.width)]
+			for x, y in random.sample(tiles, min(count, len(tiles))):
+				self.tilemap_overlay[y][x] = 'M'
+
 	def place_flowers(self):
 		# places (breakable) flowers onto tilemap overlay
 		overlay = self.generate_perlin(octaves=20)
@@ -421,9 +516,9 @@ class DungeonMap:
 					self.tilemap_overlay[y][x] = 'F'
 
 
-def get_dungeon():
+def get_dungeon(width=MAP_WIDTH, height=MAP_HEIGHT, mobs_per_room=None):
 	# generates actual dungeon
-	dungeon_tree = BSPTree()
-	tilemap = Tilemap(dungeon_tree.tree, dungeon_tree.leaf_node_rects)
-	dungeon_map = DungeonMap(tilemap)
+	dungeon_tree = BSPTree(width=width, height=height)
+	tilemap = Tilemap(dungeon_tree.tree, dungeon_tree.leaf_node_rects, width, height)
+	dungeon_map = DungeonMap(tilemap, mobs_per_room)
 	return dungeon_map
\ No newline at end of file
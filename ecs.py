@@ -0,0 +1,299 @@
+import pygame
+from array import array
+from math import sqrt
+
+from settings import *
+from collision import BLOCKING
+from game_clock import get_ticks
+
+# ai states of ecs enemies
+IDLE, CHASE, RETURN = range(3)
+THINK_RATE = 4 	# ticks between decisions of entities not chasing, spread across ticks
+
+
+class ComponentStore:
+	'''
+	packed storage for one kind of component. each field is its own array, and
+	the entities which have the component are kept together at the front of
+	them, so systems loop over only those entities with nothing in between
+	'''
+	def __init__(self, **fields):
+		# fields given as name=array typecode, or name=None for a list of python objects
+		self.fields = fields
+		self.entities = [] 	# entity at each index
+		self.index = {} 	# entity: index
+		self.version = 0 	# changes whenever entities are added or removed
+		for name, typecode in fields.items():
+			setattr(self, name, array(typecode) if typecode else [])
+
+	def __len__(self):
+		return len(self.entities)
+
+	def __contains__(self, entity):
+		return entity in self.index
+
+	def add(self, entity, **values):
+		self.version += 1
+		self.index[entity] = len(self.entities)
+		self.entities.append(entity)
+		for name, typecode in self.fields.items():
+			getattr(self, name).append(values.get(name, 0 if typecode else None))
+
+	def remove(self, entity):
+		# the last entity is moved into the removed entity's place, so the arrays stay packed
+		self.version += 1
+		index = self.index.pop(entity)
+		last = self.entities.pop()
+		for name in self.fields:
+			values = getattr(self, name)
+			value = values.pop()
+			if last != entity:
+				values[index] = value
+		if last != entity:
+			self.entities[index] = last
+			self.index[last] = index
+
+	def get(self, entity, name):
+		return getattr(self, name)[self.index[entity]]
+
+	def set(self, entity, name, value):
+		getattr(self, name)[self.index[entity]] = value
+
+
+class World:
+	'''
+	holds every entity's components and the systems which update them. entities
+	are only ids - anything that happens to them which the rest of the game needs
+	to know about (an attack landing, a death) is added to events, rather than
+	each entity holding callbacks
+	'''
+	def __init__(self, collision_grid=None):
+		self.collision_grid = collision_grid 	# walls, if entities should collide with them
+		self.next_entity = 0
+		self.events = [] 	# (event, entity) pairs since the last time they were taken
+		self.views = {} 	# entity: sprite drawing it, for entities shown through a sprite group
+		self.target = None 	# position ai entities chase (the player's)
+		self.tick = 0
+		self.joins = {} 	# cached results of join
+
+		self.transform = ComponentStore(x='d', y='d', last_x='d', last_y='d')
+		self.velocity = ComponentStore(dx='d', dy='d', speed='d')
+		self.hitbox = ComponentStore(width='l', height='l', agent=None)
+		self.animation = ComponentStore(frames=None, start='d', speed='d', depth='b') # start offsets the first frame
+		self.health = ComponentStore(value='d')
+		self.cooldown = ComponentStore(ready='d', duration='d') 	# when the entity can next act, so nothing counts down
+		self.ai = ComponentStore(state='b', home_x='d', home_y='d', notice='d', reach='d')
+		self.stores = [self.transform, self.velocity, self.hitbox, self.animation,
+			self.health, self.cooldown, self.ai]
+
+		# run in this order every tick
+		self.systems = [ai_system, movement_system, health_system]
+
+	def create(self, **components):
+		# creates an entity with the given components, e.g. transform={'x': 0, 'y': 0}
+		entity = self.next_entity
+		self.next_entity += 1
+		for name, values in components.items():
+			getattr(self, name).add(entity, **values)
+		return entity
+
+	def destroy(self, entity):
+		for store in self.stores:
+			if entity in store:
+				store.remove(entity)
+		if entity in self.views:
+			self.views.pop(entity).kill()
+
+	def join(self, store, other):
+		# index in other of each entity in store (-1 if it isn't in other), so systems
+		# can read several components of an entity without a lookup for each one.
+		# only worked out again once either store has changed
+		key = (id(store), id(other))
+		versions = (store.version, other.version)
+		if key not in self.joins or self.joins[key][0] != versions:
+			indexes = array('l', [other.index.get(entity, -1) for entity in store.entities])
+			self.joins[key] = (versions, indexes)
+		return self.joins[key][1]
+
+	def take_events(self):
+		events = self.events
+		self.events = []
+		return events
+
+	def update(self):
+		self.tick += 1
+		for system in self.systems:
+			system(self)
+
+
+def ai_system(world):
+	# entities chase the target when it is close, and go back home when it isn't.
+	# once within reach of the target, they attack when their cooldown allows.
+	# entities that aren't chasing only look for the target every few ticks.
+	# entities without a transform and velocity have nowhere to move from, so are skipped
+	if world.target is None:
+		return
+	target_x, target_y = world.target
+	ai, transform, velocity, cooldown = world.ai, world.transform, world.velocity, world.cooldown
+	positions = world.join(ai, transform)
+	movers = world.join(ai, velocity)
+	timers = world.join(ai, cooldown)
+	x, y, dir_x, dir_y = transform.x, transform.y, velocity.dx, velocity.dy
+	current_time = get_ticks()
+
+	state = ai.state
+	tick = world.tick
+	for index in range(len(ai)):
+		if state[index] != CHASE and (index + tick) % THINK_RATE:
+			continue
+		position, mover = positions[index], movers[index]
+		if position == -1 or mover == -1:
+			continue
+		dx = target_x - x[position]
+		dy = target_y - y[position]
+		distance = sqrt(dx*dx + dy*dy)
+
+		if distance <= ai.notice[index]:
+			state[index] = CHASE
+			if distance <= ai.reach[index]:
+				dx = dy = distance = 0
+				timer = timers[index]
+				if timer != -1 and cooldown.ready[timer] <= current_time:
+					cooldown.ready[timer] = current_time + cooldown.duration[timer]
+					world.events.append(('attack', ai.entities[index]))
+		else:
+			dx = ai.home_x[index] - x[position]
+			dy = ai.home_y[index] - y[position]
+			distance = sqrt(dx*dx + dy*dy)
+			if distance < velocity.speed[mover] * THINK_RATE:
+				# close enough that it could walk past home before its next decision
+				state[index] = IDLE
+				distance = 0
+			else:
+				state[index] = RETURN
+
+		if distance:
+			dir_x[mover], dir_y[mover] = dx / distance, dy / distance
+		else:
+			dir_x[mover] = dir_y[mover] = 0
+
+
+def blocked(grid, blocking, left, top, right, bottom):
+	# checks if a box (in pixels) overlaps any grid cell that blocks it
+	for row in range(int(top) // TILE_SIZE, int(bottom - 1) // TILE_SIZE + 1):
+		for col in range(int(left) // TILE_SIZE, int(right - 1) // TILE_SIZE + 1):
+			if grid.get_flags(col, row) & blocking:
+				return True
+	return False
+
+
+def movement_system(world):
+	# moves entities along their velocity, one axis at a time so that entities
+	# with a hitbox slide along walls rather than stopping dead
+	transform, velocity, hitbox = world.transform, world.velocity, world.hitbox
+	positions = world.join(velocity, transform)
+	boxes = world.join(velocity, hitbox)
+	grid = world.collision_grid
+	x, y, last_x, last_y = transform.x, transform.y, transform.last_x, transform.last_y
+
+	for index in range(len(velocity)):
+		position = positions[index]
+		if position == -1:
+			continue 	# nowhere to move from
+		old_x, old_y = x[position], y[position]
+		last_x[position], last_y[position] = old_x, old_y
+		dx = velocity.dx[index] * velocity.speed[index]
+		dy = velocity.dy[index] * velocity.speed[index]
+		if not dx and not dy:
+			continue
+
+		box = boxes[index]
+		if grid and box != -1:
+			half_w, half_h = hitbox.width[box] / 2, hitbox.height[box] / 2
+			blocking = BLOCKING[hitbox.agent[box]]
+			new_x, new_y = old_x + dx, old_y + dy
+			if blocked(grid, blocking, new_x - half_w, old_y - half_h, new_x + half_w, old_y + half_h):
+				new_x = old_x
+			if blocked(grid, blocking, new_x - half_w, new_y - half_h, new_x + half_w, new_y + half_h):
+				new_y = old_y
+			x[position], y[position] = new_x, new_y
+		else:
+			x[position], y[position] = old_x + dx, old_y + dy
+
+
+def health_system(world):
+	health = world.health
+	for index in reversed(range(len(health))):
+		# reversed, as removing an entity moves the last one into its place
+		if health.value[index] <= 0:
+			entity = health.entities[index]
+			world.events.append(('died', entity))
+			world.destroy(entity)
+
+
+def get_frame(animation, index, tick):
+	# frames are worked out from the world's tick when drawn, rather than
+	# every entity's frame being moved on each tick
+	frames = animation.frames[index]
+	return frames[int(animation.start[index] + tick * animation.speed[index]) % len(frames)]
+
+
+def render_system(world, surface, offset, alpha=1):
+	# draws every animated entity on screen, without a sprite for each one.
+	# entities are drawn between their last and current positions, as in Entity
+	transform, animation = world.transform, world.animation
+	positions = world.join(animation, transform)
+	x, y, last_x, last_y = transform.x, transform.y, transform.last_x, transform.last_y
+	# anything further than a tile outside the screen can't be seen
+	left, top = offset[0] - TILE_SIZE, offset[1] - TILE_SIZE
+	right, bottom = offset[0] + surface.get_width() + TILE_SIZE, offset[1] + surface.get_height() + TILE_SIZE
+
+	blits = []
+	for index in range(len(animation)):
+		position = positions[index]
+		if position == -1:
+			continue 	# nowhere to draw it
+		centre_x, centre_y = x[position], y[position]
+		if not (left < centre_x < right and top < centre_y < bottom):
+			continue
+		centre_x = last_x[position] + (centre_x - last_x[position]) * alpha - offset[0]
+		centre_y = last_y[position] + (centre_y - last_y[position]) * alpha - offset[1]
+		image = get_frame(animation, index, world.tick)
+		blits.append((animation.depth[index], centre_y, image,
+			(centre_x - image.get_width() / 2, centre_y - image.get_height() / 2)))
+	blits.sort(key=lambda blit: (blit[0], blit[1]))
+	surface.blits([(image, pos) for depth, centre_y, image, pos in blits], False)
+
+
+class EntitySprite(pygame.sprite.Sprite):
+	'''
+	adapter which shows an ecs entity through the existing sprite groups, so that
+	entities can be drawn by the camera groups alongside ordinary sprites
+	'''
+	def __init__(self, world, entity, groups):
+		super().__init__(groups)
+		self.world = world
+		self.entity = entity
+		world.views[entity] = self
+
+	@property
+	def image(self):
+		animation = self.world.animation
+		return get_frame(animation, animation.index[self.entity], self.world.tick)
+
+	@property
+	def depth(self):
+		return self.world.animation.get(self.entity, 'depth')
+
+	@property
+	def rect(self):
+		return self.image.get_rect(center=(
+			self.world.transform.get(self.entity, 'x'), self.world.transform.get(self.entity, 'y')))
+
+	def interpolated_rect(self, alpha):
+		transform = self.world.transform
+		index = transform.index[self.entity]
+		last_x, last_y = transform.last_x[index], transform.last_y[index]
+		return self.image.get_rect(center=(
+			last_x + (transform.x[index] - last_x) * alpha,
+			last_y + (transform.y[index] - last_y) * alpha))
@@ -0,0 +1,32 @@
+class GameClock:
+	'''
+	clock which counts game time rather than real time - it only moves forward
+	when the game ticks, so it stops while the game is paused and speeds up
+	when ticks are run faster (e.g. headless simulations)
+	'''
+	def __init__(self):
+		self.ticks = 0 # game time passed, in milliseconds
+		self.tick_count = 0 # number of times the clock has been advanced, which animations are timed by
+
+	def get_ticks(self):
+		return int(self.ticks)
+
+	def advance(self, ms):
+		self.ticks += ms
+		self.tick_count += 1
+
+
+clock = GameClock() # clock currently in use
+
+def get_ticks():
+	# game time in milliseconds, read from the clock currently in use
+	return clock.get_ticks()
+
+def get_tick_count():
+	# game ticks run so far on the clock currently in use
+	return clock.tick_count
+
+def set_clock(new_clock):
+	# swaps the clock that the game reads time from
+	global clock
+	clock = new_clock
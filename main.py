@@ -1,31 +1,83 @@
+from time import perf_counter
+START = perf_counter() # taken before anything else is imported, for the startup report
+
+import os
+import random
 import pygame
 import sys
+from argparse import ArgumentParser
 
 from settings import *
-from states import TitleState, MainMenuState, NewGameCheckState, LoadSaveState, DeleteSaveState, TutorialState, ForestState, DungeonState, GameOverState
-from pause_menu import Stats
-from player_store import TempStore
+from player_store import TempStore, recover_saves, flush_saves
+from timings import StartupReport, FrameStats
+from game_clock import GameClock, set_clock
+import controls
+
+# states whose gameplay comes only from per tick input, so can be recorded and replayed
+# (menus are driven by events, which are not recorded)
+REPLAY_STATES = ('forest', 'dungeon')
 
 class Game:
 	'''
 	controls the main game loop (keeps the game running)
 	'''
-	def __init__(self, states, start_state):
+	def __init__(self, states, start_state, report=None, headless=False, render=True,
+		time_scale=1, max_ticks=None, game_clock=None, input_source=None, frame_stats=None):
+		self.report = report
+		if self.report:
+			self.report.mark('imports')
+
+		# simulation settings
+		self.headless = headless		# no real window is opened
+		self.render = render			# frames are drawn (turning this off only runs game logic)
+		self.time_scale = time_scale	# game time passed per real second (0 runs ticks back to back)
+		self.max_ticks = max_ticks		# game stops after this many ticks, if given
+		self.tick_count = 0
+		self.frame_stats = frame_stats	# frame times are recorded here, if given
+
+		# player input is read from the keyboard and mouse, unless another source
+		# is given, in which case the run ends when the player leaves the start state
+		self.recording = input_source is not None
+		self.input_source = input_source if input_source else controls.InputSource()
+		controls.set_input(self.input_source)
+
+		# everything reads game time from this clock, which only moves when the game ticks
+		self.game_clock = game_clock if game_clock else GameClock()
+		set_clock(self.game_clock)
+
 		# general setup + initialisation
+		if self.headless:
+			# dummy video driver - surfaces still work, but nothing is shown
+			os.environ['SDL_VIDEODRIVER'] = 'dummy'
 		pygame.init()
+		if self.report:
+			self.report.mark('pygame.init')
 		pygame.display.set_caption('game')
-		self.screen = pygame.display.set_mode((SCREEN_WIDTH,SCREEN_HEIGHT), vsync=1)
+		self.screen = pygame.display.set_mode((SCREEN_WIDTH,SCREEN_HEIGHT), vsync=not self.headless)
 		self.clock = pygame.time.Clock()
 		self.running = True
 		self.paused = False
 		pygame.mouse.set_visible(False)
+		recover_saves() # finishes (or throws away) any save cut off by the game closing
 		self.data_store = TempStore()
+		if self.report:
+			self.report.mark('window')
 
-		# state initialisation
+		# state initialisation - states are only built the first time they are needed
 		self.states = states
+		self.built_states = {}
 		self.state_label = start_state
-		self.state = self.states[self.state_label]
-		self.state.new()
+		self.state = self.get_state(self.state_label)
+		self.state.new(self.data_store)
+		if self.report:
+			self.report.mark('first state')
+
+	def get_state(self, label):
+		# returns the state for the given label, building it from its factory
+		# if it has not been visited yet
+		if label not in self.built_states:
+			self.built_states[label] = self.states[label]()
+		return self.built_states[label]
 
 	def change_state(self):
 		# handles the change from one state to another
@@ -46,7 +98,7 @@ class Game:
 		# flips state and initialises it
 		self.state_label = self.state.next
 		self.state.reset_next()
-		self.state = self.states[self.state_label]
+		self.state = self.get_state(self.state_label)
 		self.state.new(self.data_store)
 		
 	def event_loop(self):
@@ -64,8 +116,9 @@ class Game:
 				# flips pause state every time escape key is pressed 
 				# (when in one of the above areas)
 				if event.key == pygame.K_ESCAPE:
+					from pause_menu import Stats # only needed once the player can pause
 					self.paused = not self.paused
-					self.state.menu = Stats(self.state.player)
+					self.state.menu = self.state.menus.get(Stats)
 					pygame.mouse.set_visible(self.paused)
 
 			# passes the player's current data, the currently queued event, and the pause status
@@ -73,7 +126,11 @@ class Game:
 			self.state.event_handler(event, self.data_store, self.paused)
 
 	def update(self):
-		# updates each state / calls state's updater
+		# runs a single tick of the game's logic
+		if self.recording and (self.state.done or self.state.quit):
+			# the pause menu was used to leave - its clicks are not recorded
+			self.running = False
+			return
 		if self.state.quit:
 			self.running = False
 		elif self.state.done:
@@ -82,35 +139,152 @@ class Game:
 		if not self.paused:
 			# if player not in pause menu, game continues to update 
 			# (enemies move, player can move, etc.)
+			controls.poll()
+			self.game_clock.advance(TICK_TIME * 1000)
 			self.state.update()
+
+		self.tick_count += 1
+		if self.max_ticks and self.tick_count >= self.max_ticks:
+			self.running = False
+		if self.recording and (self.state.done or self.input_source.finished):
+			self.running = False
+
+	def draw(self, alpha):
+		# draws the current state, alpha being how far the frame is between ticks
+		self.screen.fill(CYAN)
+		if not self.paused:
+			self.state.draw(alpha)
 		else:
-			# if player is in the pause menu, separate state update method called
-			# so that game is not updating outside of the menu (appearing to be paused)
+			# if player is in the pause menu, separate state draw method called
+			# so that the menu is drawn over the (paused) game
 			self.state.paused()
 
 	def main(self):
-		# main loop
+		# main loop - the game's logic is ticked at a fixed rate (TICK_RATE), however
+		# many frames are drawn, so the game runs at the same speed on any machine
+		lag = 0 # game time since the last tick was run
 		while self.running:
-			self.clock.tick(FPS)
-			self.screen.fill(CYAN)
+			if self.time_scale:
+				# real time passed is scaled, so a time scale of 10 runs 10 ticks per frame.
+				# after a very slow frame, only some of the missed time is caught up on,
+				# otherwise running all the missed ticks would make the next frame slow too
+				frame_time = self.clock.tick(FPS) / 1000
+				lag += min(frame_time, MAX_FRAME_TIME) * self.time_scale
+			else:
+				# no time scale - one tick every loop, as fast as the machine can run them
+				self.clock.tick()
+				lag = TICK_TIME
+
+			frame_start = perf_counter()
 			self.event_loop()
-			self.update()
-			pygame.display.update()
+			while lag >= TICK_TIME and self.running:
+				self.update()
+				lag -= TICK_TIME
+
+			if self.render:
+				self.draw(lag / TICK_TIME)
+				pygame.display.update()
+			if self.frame_stats:
+				self.frame_stats.add(perf_counter() - frame_start)
+
+			if self.report:
+				# only the first presented frame is reported
+				self.report.mark('first frame')
+				self.report.display()
+				self.report = None
+
+		# saves still being written are finished before the game closes
+		flush_saves()
+
+def lazy_state(name):
+	# returns a factory which imports the states module (and with it the sprite,
+	# menu and dungeon generation modules) and builds the named state only
+	# when the game first changes to it
+	def build():
+		import states
+		return getattr(states, name)()
+	return build
 
 # the various states that the game can be in
 STATES = {
-	'title'		: TitleState(),
-	'menu'		: MainMenuState(),
-	'new_check' : NewGameCheckState(),
-	'saves'		: LoadSaveState(),
-	'delete'	: DeleteSaveState(),
-	'tutorial'	: TutorialState(),
-	'forest'	: ForestState(),
-	'dungeon'	: DungeonState(),
-	'game_over'	: GameOverState()}
-
-# runs the game
-game = Game(STATES, 'title') # first screen user sees is the title screen
-game.main()
-pygame.quit()
-sys.exit()
\ No newline at end of file
+	'title'		: lazy_state('TitleState'),
+	'menu'		: lazy_state('MainMenuState'),
+	'new_check' : lazy_state('NewGameCheckState'),
+	'saves'		: lazy_state('LoadSaveState'),
+	'delete'	: lazy_state('DeleteSaveState'),
+	'tutorial'	: lazy_state('TutorialState'),
+	'forest'	: lazy_state('ForestState'),
+	'dungeon'	: lazy_state('DungeonState'),
+	'game_over'	: lazy_state('GameOverState')}
+
+if __name__ == '__main__':
+	parser = ArgumentParser()
+	parser.add_argument('--timings', action='store_true',
+		help='print how long startup took, up to the first frame being shown')
+	parser.add_argument('--headless', action='store_true',
+		help='run without a window (uses the SDL dummy video driver)')
+	parser.add_argument('--no-render', dest='render', action='store_false',
+		help='only run game logic, without drawing any frames')
+	parser.add_argument('--speed', type=float, default=1,
+		help='game speed multiplier (0 runs ticks as fast as possible)')
+	parser.add_argument('--start', default='title', choices=STATES.keys(),
+		help='state to start the game in')
+	parser.add_argument('--ticks', type=int,
+		help='stop after this many ticks of game logic')
+	parser.add_argument('--seed', type=int,
+		help='seed for random generation (dungeon layouts, enemy spawns)')
+	parser.add_argument('--record', metavar='FILE',
+		help='record the player\'s input to a file, for replaying (needs --start forest or dungeon)')
+	parser.add_argument('--replay', metavar='FILE',
+		help='replay a recording, then print frame time statistics')
+	args = parser.parse_args()
+
+	input_source = frame_stats = None
+	if args.replay:
+		from replay import InputReplay
+		input_source = InputReplay(args.replay)
+		args.seed, args.start = input_source.seed, input_source.start
+		frame_stats = FrameStats()
+	elif args.record:
+		if args.start not in REPLAY_STATES:
+			parser.error('--record needs --start forest or dungeon')
+		from replay import InputRecorder
+		if args.seed is None:
+			args.seed = random.randrange(2**32)
+		input_source = InputRecorder(args.seed, args.start)
+	if input_source:
+		from ai import set_budget
+		set_budget(None) # otherwise enemy movement and decisions would depend on the machine's speed
+	if args.seed is not None:
+		random.seed(args.seed)
+
+	# runs the game
+	report = StartupReport(START) if args.timings else None
+	game = Game(STATES, args.start, report, # first screen user sees is the title screen by default
+		headless=args.headless, render=args.render, time_scale=args.speed, max_ticks=args.ticks,
+		input_source=input_source, frame_stats=frame_stats)
+	start = perf_counter()
+	game.main()
+	if args.record or args.replay:
+		from replay import game_summary
+		final = game_summary(game)
+		if args.record:
+			input_source.save(args.record, final)
+			print(f'recorded {input_source.ticks} ticks to {args.record}')
+		else:
+			frame_stats.display()
+			if final == input_source.final:
+				print('replay matches the recording')
+			else:
+				print('replay does not match the recording')
+				print(f'  recorded: {input_source.final}')
+				print(f'  replayed: {final}')
+	if args.headless:
+		real_time = perf_counter() - start
+		game_time = game.game_clock.get_ticks() / 1000
+		print(f'simulated {game.tick_count} ticks ({game_time:.1f}s of game time) '
+			f'in {real_time:.1f}s ({game_time / max(real_time, 1e-9):.1f}x speed)')
+		if hasattr(game.state, 'enemy_ai'):
+			print(f'enemy updates put off by the ai time budget: {game.state.enemy_ai.deferrals}')
+	pygame.quit()
+	sys.exit()
@@ -0,0 +1,222 @@
+from array import array
+from heapq import heappush, heappop
+
+from settings import *
+from collision import BLOCKING, CORRIDOR
+
+# neighbouring cells as (column offset, row offset, cost) - diagonals cost ~sqrt(2)
+NEIGHBOURS = (
+	(1, 0, 10), (-1, 0, 10), (0, 1, 10), (0, -1, 10),
+	(1, 1, 14), (1, -1, 14), (-1, 1, 14), (-1, -1, 14))
+
+def octile(a, b):
+	# cost of the shortest path between two cells, if nothing was in the way
+	dx = abs(a[0] - b[0])
+	dy = abs(a[1] - b[1])
+	return 10 * max(dx, dy) + 4 * min(dx, dy)
+
+
+class FlowField:
+	'''
+	distance from every walkable cell of the grid to one goal cell, found with
+	dijkstra. each cell stores the neighbour to step to next, so any number of
+	enemies can find their way to the goal with one lookup each
+	'''
+	def __init__(self, grid, goal, agent='enemy'):
+		self.grid = grid
+		self.goal = goal 				# (col, row)
+		self.blocking = BLOCKING[agent]
+		self.next_cells = None 			# built the first time it is needed
+
+	def walkable(self, col, row):
+		return not self.grid.get_flags(col, row) & self.blocking
+
+	def build(self):
+		width = self.grid.width
+		size = width * self.grid.height
+		dist = array('l', [-1]) * size
+		self.next_cells = array('l', [-1]) * size # index of the next cell on the way to the goal
+
+		# the goal itself may be blocked (e.g. player standing in a corridor),
+		# in which case enemies are led to the cells next to it
+		if not 0 <= self.goal[0] < width or not 0 <= self.goal[1] < self.grid.height:
+			return
+		goal = self.goal[1] * width + self.goal[0]
+		dist[goal] = 0
+		queue = [(0, goal)]
+		while queue:
+			cost, index = heappop(queue)
+			if cost > dist[index]:
+				continue # already reached by a shorter path
+			row, col = divmod(index, width)
+			for dx, dy, step in NEIGHBOURS:
+				x, y = col + dx, row + dy
+				if not self.walkable(x, y):
+					continue
+				if dx and dy and not (self.walkable(x, row) and self.walkable(col, y)):
+					continue # no cutting corners, as hitboxes would catch on them
+				neighbour = y * width + x
+				new_cost = cost + step
+				if dist[neighbour] == -1 or new_cost < dist[neighbour]:
+					dist[neighbour] = new_cost
+					self.next_cells[neighbour] = index
+					heappush(queue, (new_cost, neighbour))
+
+	def next_step(self, pos):
+		# centre (in pixels) of the next cell to move to from pos, or None if pos is
+		# already in the goal cell or can't reach it
+		if self.next_cells is None:
+			self.build()
+		col, row = pos[0] // TILE_SIZE, pos[1] // TILE_SIZE
+		if not 0 <= col < self.grid.width or not 0 <= row < self.grid.height:
+			return None
+		index = self.next_cells[row * self.grid.width + col]
+		if index == -1:
+			return None
+		row, col = divmod(index, self.grid.width)
+		return (col * TILE_SIZE + TILE_SIZE // 2, row * TILE_SIZE + TILE_SIZE // 2)
+
+
+class Navigator:
+	'''
+	flow fields shared by every enemy - one towards the player, rebuilt only when
+	the player moves into a different cell, and one towards each return position,
+	kept since return positions never change
+	'''
+	def __init__(self, grid, agent='enemy'):
+		self.grid = grid
+		self.agent = agent
+		self.target_field = None
+		self.fields = {} # goal cell: flow field
+
+	def get_cell(self, pos):
+		return (int(pos[0] // TILE_SIZE), int(pos[1] // TILE_SIZE))
+
+	def set_target(self, pos):
+		# called every tick with the player's position
+		cell = self.get_cell(pos)
+		if not self.target_field or self.target_field.goal != cell:
+			self.target_field = FlowField(self.grid, cell, self.agent)
+
+	def step_to_target(self, pos):
+		return self.target_field.next_step(pos)
+
+	def step_to(self, pos, goal_pos):
+		cell = self.get_cell(goal_pos)
+		if cell not in self.fields:
+			self.fields[cell] = FlowField(self.grid, cell, self.agent)
+		return self.fields[cell].next_step(pos)
+
+
+class HierarchicalPathfinder:
+	'''
+	finds long paths in two steps - a* over the dungeon's room graph picks which
+	regions to pass through, then a short a* inside each region joins up the
+	portals between them. routes between regions and paths between portals are
+	the same for every path using them, so both are cached
+	'''
+	def __init__(self, room_graph, agent='player'):
+		self.graph = room_graph
+		self.corridors_blocked = bool(BLOCKING[agent] & CORRIDOR)
+		self.routes = {} 	# (start region, goal region): regions passed through
+		self.segments = {} 	# (portal, portal): cells between them
+
+	def allowed(self, region):
+		return region != -1 and not (self.corridors_blocked and self.graph.is_corridor[region])
+
+	def find_route(self, start, goal):
+		# a* over regions - regions are entered and left through their portals, and
+		# the route is measured from the centre of the start region to the goal's
+		key = (start, goal)
+		if key in self.routes:
+			return self.routes[key]
+
+		goal_cell = self.graph.centres[goal]
+		costs = {start: 0}
+		came_from = {start: None}
+		queue = [(0, 0, start, self.graph.centres[start])]
+		route = None
+		while queue:
+			estimate, cost, region, entry = heappop(queue)
+			if region == goal:
+				route = []
+				while region is not None:
+					route.append(region)
+					region = came_from[region]
+				route.reverse()
+				break
+			if cost > costs[region]:
+				continue
+			for neighbour, (exit_cell, next_cell) in self.graph.portals[region].items():
+				if not self.allowed(neighbour):
+					continue
+				new_cost = cost + octile(entry, exit_cell) + 10
+				if neighbour not in costs or new_cost < costs[neighbour]:
+					costs[neighbour] = new_cost
+					came_from[neighbour] = region
+					heappush(queue, (new_cost + octile(next_cell, goal_cell), new_cost, neighbour, next_cell))
+
+		self.routes[key] = route
+		return route
+
+	def find_local(self, start, goal, regions):
+		# a* between two cells, only through cells in the given regions.
+		# returns the cells after start, up to and including goal
+		costs = {start: 0}
+		came_from = {start: None}
+		queue = [(octile(start, goal), 0, start)]
+		while queue:
+			estimate, cost, cell = heappop(queue)
+			if cell == goal:
+				path = []
+				while cell != start:
+					path.append(cell)
+					cell = came_from[cell]
+				path.reverse()
+				return path
+			if cost > costs[cell]:
+				continue
+			col, row = cell
+			for dx, dy, step in NEIGHBOURS:
+				x, y = col + dx, row + dy
+				if self.graph.region_at(x, y) not in regions:
+					continue
+				if dx and dy and not (self.graph.region_at(x, row) in regions and
+					self.graph.region_at(col, y) in regions):
+					continue # no cutting corners
+				new_cost = cost + step
+				if (x, y) not in costs or new_cost < costs[(x, y)]:
+					costs[(x, y)] = new_cost
+					came_from[(x, y)] = cell
+					heappush(queue, (new_cost + octile((x, y), goal), new_cost, (x, y)))
+		return []
+
+	def find_path(self, start_pos, goal_pos):
+		# list of cells (col, row) leading from start_pos to goal_pos (in pixels),
+		# or None if there is no way there
+		start = (int(start_pos[0] // TILE_SIZE), int(start_pos[1] // TILE_SIZE))
+		goal = (int(goal_pos[0] // TILE_SIZE), int(goal_pos[1] // TILE_SIZE))
+		start_region = self.graph.region_at(*start)
+		goal_region = self.graph.region_at(*goal)
+		if not self.allowed(start_region) or not self.allowed(goal_region):
+			return None
+		route = self.find_route(start_region, goal_region)
+		if route is None:
+			return None
+
+		path = [start]
+		cell = start
+		for region, next_region in zip(route, route[1:]):
+			exit_cell, next_cell = self.graph.portals[region][next_region]
+			if cell == start:
+				# first part of the path depends on where it starts, so isn't cached
+				segment = self.find_local(cell, exit_cell, (region,))
+			else:
+				if (cell, exit_cell) not in self.segments:
+					self.segments[(cell, exit_cell)] = self.find_local(cell, exit_cell, (region,))
+				segment = self.segments[(cell, exit_cell)]
+			path += segment
+			path.append(next_cell)
+			cell = next_cell
+		path += self.find_local(cell, goal, (goal_region,))
+		return path
@@ -63,7 +63,7 @@ class TextBubble:
 
 	def create_text(self, text):
 		# creates text displayed on the bubble
-		self.font = pygame.font.Font(UI_FONT, TEXT_XS)
+		self.font = get_font(TEXT_XS)
 		self.text_surf = self.font.render(text, False, BLACK)
 		self.text_rect = self.text_surf.get_rect()
 
@@ -3,23 +3,61 @@ import pygame
 from settings import *
 from buttons import Tab, GenButton, PromptButton, UpgradeButton
 
+class MenuPages:
+	'''
+	every page of the pause menu that has been opened. pages are only built the
+	first time they are needed, so pausing again or moving between pages just
+	changes which already built page is shown
+	'''
+	def __init__(self):
+		self.pages = {}
+
+	def get(self, page, menu_type=None):
+		if (page, menu_type) not in self.pages:
+			self.pages[(page, menu_type)] = page(menu_type)
+		menu = self.pages[(page, menu_type)]
+		# buttons may still be highlighted from the last time the page was shown
+		mouse_pos = pygame.mouse.get_pos()
+		for button in menu.buttons:
+			button.on_hover(mouse_pos)
+		return menu
+
+
 class PauseMenu:
 	'''
 	base pause menu class
 	pause menu functions like game - both state machines
+
+	everything on a page that never changes (background, check screen and text)
+	is drawn onto one surface when the page is built, so only the buttons and
+	anything showing the player's stats are drawn separately each frame
 	'''
+	bg_path = 'graphics/ui/backgrounds/pause.png'
+
 	def __init__(self,menu_type):
 		self.type = menu_type
 
 		self.display_surface = pygame.display.get_surface()
-		self.bg = pygame.image.load(
-			'graphics/ui/backgrounds/pause.png').convert_alpha()
+		self.bg = load_image(self.bg_path)
 		self.bg_rect = self.bg.get_rect(center=(MID_W,MID_H))
+		self.check_bg = None
+		self.text = []
 		self.create_self(menu_type)
+		self.layout = self.create_layout()
+
+	def create_layout(self):
+		layout = self.bg.copy()
+		offset = pygame.math.Vector2(self.bg_rect.topleft)
+		if self.check_bg:
+			layout.blit(self.check_bg, self.check_bg_rect.topleft - offset)
+		for text in self.text:
+			layout.blit(text.text_surf, text.text_rect.topleft - offset)
+		return layout
 
 	def draw_menu(self):
-		self.display_surface.blit(self.bg, self.bg_rect)
-		self.draw()
+		self.display_surface.blit(self.layout, self.bg_rect)
+		for button in self.buttons:
+			button.custom_draw()
 
 	def display(self, player=None):
 		pass
@@ -29,13 +67,13 @@ class Stats(PauseMenu):
 	'''
 	stats section of pause menu
 	'''
-	def __init__(self,menu_type):
+	bg_path = 'graphics/ui/backgrounds/pause_stats.png'
+
+	def __init__(self,menu_type=None):
+		self.wisps = None 	# number of wisps shown, so the text is only made again when it changes
 		super().__init__(menu_type)
 		self.type = 'stats'
 
-		self.bg = pygame.image.load(
-			'graphics/ui/backgrounds/pause_stats.png').convert_alpha()
-
 	def create_tabs(self):
 		# creates tabs at the top of pause menu
 		self.buttons = pygame.sprite.Group()
@@ -46,7 +84,6 @@ class Stats(PauseMenu):
 			self.buttons, (MID_W,150), 'general', '_other', WHITE)
 
 	def create_self(self,menu_type):
-		self.text = []
 		self.create_tabs()
 
 		self.hp_rect = pygame.Rect((216,286),(71,193))
@@ -64,26 +101,22 @@ class Stats(PauseMenu):
 		self.mana_rect = pygame.Rect((735,286),(71,193))
 		self.mana_upgrade = UpgradeButton(
 			[self.buttons, self.upgrade_btns], (711,263), 'mana')
-		
-		self.get_wisps(menu_type)
 
-	def draw(self):
-		for button in self.buttons:
-			button.custom_draw()
-		for text in self.text:
-			text.draw(self.display_surface)
-
-	def get_wisps(self, player):
-		# displays how many wisps the player currently has to spend
 		self.text.append(Text('current', 
 			(MID_W,280), 
 			TEXT_S, WHITE))
 		self.text.append(Text('wisps:', 
 			(MID_W,310), 
 			TEXT_S, WHITE))
-		self.text.append(Text(str(player.stats['wisps']), 
-			(MID_W,365), 
-			TEXT_M, WHITE))
+
+	def get_wisps(self, player):
+		# displays how many wisps the player currently has to spend
+		if player.stats['wisps'] != self.wisps:
+			self.wisps = player.stats['wisps']
+			self.wisps_text = Text(str(self.wisps), 
+				(MID_W,365), 
+				TEXT_M, WHITE)
+		self.wisps_text.draw(self.display_surface)
 
 	def display_bar(self,current,max,rect,colour):
 		# creates and draws a coloured bar which displays how much of a stat
@@ -119,10 +152,9 @@ class UpgradeCheck(PauseMenu):
 	def create_self(self,menu_type):
 		self.type = menu_type
 
-		self.check_bg = pygame.image.load(
-			'graphics/ui/backgrounds/check_screen.png').convert_alpha()
+		self.check_bg = load_image('graphics/ui/backgrounds/check_screen.png')
 		self.check_bg_rect = self.check_bg.get_rect(center=(MID_W,MID_H))
-		self.text = (Text('upgrade ' + self.type + '?',
+		self.text.append(Text('upgrade ' + self.type + '?',
 			(MID_W, MID_H - 40), 
 			TEXT_M, CYAN))
 		self.buttons = pygame.sprite.Group()
@@ -131,12 +163,6 @@ class UpgradeCheck(PauseMenu):
 		self.no_btn = PromptButton(
 			self.buttons, (544,422), 'no')
 
-	def draw(self):
-		self.display_surface.blit(self.check_bg, self.check_bg_rect)
-		self.text.draw(self.display_surface)
-		for button in self.buttons:
-			button.custom_draw()
-
 
 class NoUpgrade(PauseMenu):
 	'''
@@ -149,10 +175,8 @@ class NoUpgrade(PauseMenu):
 	def create_self(self,menu_type):
 		self.type = 'no_upgrade_' + menu_type
 
-		self.check_bg = pygame.image.load(
-			'graphics/ui/backgrounds/check_screen.png').convert_alpha()
+		self.check_bg = load_image('graphics/ui/backgrounds/check_screen.png')
 		self.check_bg_rect = self.check_bg.get_rect(center=(MID_W,MID_H))
-		self.text = []
 		self.buttons = pygame.sprite.Group()
 		self.ok_btn = PromptButton(
 			self.buttons, (384,422), 'ok')
@@ -171,13 +195,6 @@ class NoUpgrade(PauseMenu):
 			(MID_W, MID_H - 26), 
 			TEXT_M, CYAN))
 
-	def draw(self):
-		self.display_surface.blit(self.check_bg,self.check_bg_rect)
-		for text in self.text:
-			text.draw(self.display_surface)
-		for button in self.buttons:
-			button.custom_draw()	
-
 
 class General(PauseMenu):
 	'''
@@ -213,10 +230,6 @@ class General(PauseMenu):
 		self.general_tab = Tab(
 			self.buttons, (MID_W,150), 'general', '', BLACK)
 
-	def draw(self):
-		for button in self.buttons:
-			button.custom_draw()
-
 
 class Check(PauseMenu):
 	'''
@@ -229,7 +242,6 @@ class Check(PauseMenu):
 		self.exit_type = menu_type
 		self.type = 'check'
 
-		self.text = []
 		self.text.append(Text('are you sure you',
 			(MID_W, MID_H - 104), 
 			TEXT_M, CYAN))
@@ -240,8 +252,7 @@ class Check(PauseMenu):
 			(MID_W, MID_H + 18), 
 			TEXT_S, CYAN))
 
-		self.check_bg = pygame.image.load(
-			'graphics/ui/backgrounds/check_screen.png').convert_alpha()
+		self.check_bg = load_image('graphics/ui/backgrounds/check_screen.png')
 		self.check_bg_rect = self.check_bg.get_rect(center=(MID_W,MID_H))
 		self.buttons = pygame.sprite.Group()
 		self.yes_btn = PromptButton(
@@ -249,13 +260,6 @@ class Check(PauseMenu):
 		self.no_btn = PromptButton(
 			self.buttons, (544,422), 'no')
 
-	def draw(self):
-		self.display_surface.blit(self.check_bg, self.check_bg_rect)
-		for text in self.text:
-			text.draw(self.display_surface)
-		for button in self.buttons:
-			button.custom_draw()
-
 	def full_exit(self):
 		# if the player has chosen to quit the game completely when 
 		# not in a main menu, return true
@@ -274,10 +278,8 @@ class SaveCheck(PauseMenu):
 	def create_self(self,menu_type):
 		self.type = 'saving'
 
-		self.check_bg = pygame.image.load(
-			'graphics/ui/backgrounds/check_screen.png').convert_alpha()
+		self.check_bg = load_image('graphics/ui/backgrounds/check_screen.png')
 		self.check_bg_rect = self.check_bg.get_rect(center=(MID_W,MID_H))
-		self.text = []
 		self.text.append(Text('save your',
 			(MID_W, MID_H - 90), 
 			TEXT_M, CYAN))
@@ -289,11 +291,4 @@ class SaveCheck(PauseMenu):
 		self.yes_btn = PromptButton(
 			self.buttons, (222,422), 'yes')
 		self.no_btn = PromptButton(
-			self.buttons, (544,422), 'no')
-		
-	def draw(self):
-		self.display_surface.blit(self.check_bg, self.check_bg_rect)
-		for text in self.text:
-			text.draw(self.display_surface)
-		for button in self.buttons:
-			button.custom_draw()
\ No newline at end of file
+			self.buttons, (544,422), 'no')
\ No newline at end of file
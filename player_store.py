@@ -1,6 +1,116 @@
 import os
-from json import load, dump
+from json import load, dumps
 from copy import deepcopy
+from threading import Thread, Condition
+from time import time_ns
+
+INDEX_PATH = 'saves/index.json' # summary of every save, so menus don't have to open them
+
+def save_path(slot):
+	return 'saves/save' + slot + '.txt'
+
+
+def write_atomic(path, contents, modified=None):
+	# writes to a temporary file which is flushed to disk and then renamed over the
+	# old file, so the file is only ever the old version or the new one in full.
+	# modified (ns) is set as the file's modification time, if given
+	temp_path = path + '.tmp'
+	with open(temp_path, 'wb') as file:
+		file.write(contents)
+		file.flush()
+		os.fsync(file.fileno())
+	os.replace(temp_path, path)
+	if modified is not None:
+		os.utime(path, ns=(modified, modified))
+
+
+def recover_saves():
+	# a temporary file left in the saves folder means the game closed partway
+	# through saving. if the file was written in full it is newer than the one it
+	# was replacing, so is put in its place - otherwise it is thrown away
+	if not os.path.exists('saves'):
+		return
+	for file in os.listdir('saves'):
+		if file.endswith('.tmp'):
+			temp_path = os.path.join('saves', file)
+			try:
+				with open(temp_path) as temp_file:
+					load(temp_file)
+			except (OSError, ValueError):
+				os.remove(temp_path)
+			else:
+				os.replace(temp_path, temp_path[:-4])
+
+
+class SaveWriter:
+	'''
+	writes files on a background thread, so saving never holds up a frame. if a
+	file is saved again before the last write of it has started, only the latest
+	version is written
+	'''
+	def __init__(self):
+		self.pending = {} 		# path: (contents, modified time) waiting to be written
+		self.writing = None 	# path being written
+		self.errors = {} 		# path: error from its last write, if that write failed
+		self.condition = Condition()
+		self.thread = Thread(target=self.run, daemon=True)
+		self.thread.start()
+
+	def write(self, path, contents, modified=None):
+		with self.condition:
+			self.pending[path] = (contents, modified)
+			self.condition.notify_all()
+
+	def run(self):
+		while True:
+			with self.condition:
+				while not self.pending:
+					self.condition.wait()
+				# files are written in the order they were first queued
+				path = next(iter(self.pending))
+				contents, modified = self.pending.pop(path)
+				self.writing = path
+			try:
+				write_atomic(path, contents, modified)
+				error = None
+			except OSError as write_error:
+				error = write_error
+			with self.condition:
+				# a failed file only counts as saved once it has been written again
+				if error:
+					self.errors[path] = error
+				else:
+					self.errors.pop(path, None)
+				self.writing = None
+				self.condition.notify_all()
+
+	def status(self):
+		# 'saving' until everything queued has been written, then 'saved' - or
+		# 'failed' while any file's last write failed
+		with self.condition:
+			if self.pending or self.writing:
+				return 'saving'
+			return 'failed' if self.errors else 'saved'
+
+	def flush(self):
+		# waits for everything queued to be written
+		with self.condition:
+			while self.pending or self.writing:
+				self.condition.wait()
+
+
+writer = None # started the first time anything is saved
+
+def get_writer():
+	global writer
+	if writer is None:
+		writer = SaveWriter()
+	return writer
+
+def flush_saves():
+	# finishes any saves still being written (e.g. before the game closes)
+	if writer:
+		writer.flush()
 
 class TempStore:
 	'''
@@ -21,6 +131,7 @@ class TempStore:
 		self.data = {} # current player data
 		self.save_data = {} # imported save data from chosen save file
 		self.save_slot = None # slot number of save which data has been loaded from
+		self.index = None # slot: summary of that save, read from the index file when first needed
 
 	def get_current(self):
 		# retrieves current player data
@@ -35,53 +146,112 @@ class TempStore:
 
 	def import_save(self, slot):
 		# imports data from selected save
-		with open('saves/save'+slot+'.txt') as save_file:
+		flush_saves()
+		with open(save_path(slot)) as save_file:
 			self.save_data = load(save_file)
 		self.data = deepcopy(self.save_data)
 		self.save_slot = slot
 
+	def select_save(self, slot):
+		# picks a save (e.g. to delete) without reading it
+		self.save_slot = slot
+
 	def create_new_save(self, slot):
 		# creates new save file using base data 
 		# (when new game is created) 
-		with open('saves/save'+slot+'.txt','w') as save_file:
-			dump(self.base_data,save_file)
+		self.write_save(slot, self.base_data)
 		self.save_data = deepcopy(self.base_data)
 		self.save_slot = slot
 
 	def write_to_save(self):
 		# updates currently in-use save file with current player data
-		with open('saves/save'+self.save_slot+'.txt','w') as save_file:
-			dump(self.data,save_file)
+		self.write_save(self.save_slot, self.data)
 		self.save_data = deepcopy(self.data)
 
-	def check_for_saves(self):
-		# checks for existence of save files in saves directory
-		
+	def write_save(self, slot, data):
+		# the save is written in the background, stamped with the time it was made so
+		# the index entry (written straight after) matches the file
+		contents = dumps(data).encode()
+		modified = time_ns()
+		get_writer().write(save_path(slot), contents, modified)
+		self.get_index()[slot] = self.summarise(data, len(contents), modified)
+		self.write_index()
+
+	def save_status(self):
+		# whether the last save has been written yet
+		return get_writer().status()
+
+	def summarise(self, data, size, modified):
+		# what the load menu shows about a save, along with the file's size and time
+		# last written, which tell if the save has changed since it was summarised
+		return {
+			'dungeons': data['dungeons'],
+			'wisps': data['wisps'],
+			'saved': modified,
+			'size': size}
+
+	def get_index(self):
+		# summary of every save by slot - read from the index file once, then kept up
+		# to date as saves are written, so nothing is opened to show what's in a save
+		if self.index is None:
+			self.load_index()
+		return self.index
+
+	def load_index(self):
 		if not os.path.exists('saves'):
 			os.makedirs('saves')
-		
-		if not os.listdir('saves'):
-			return False
-		else:
-			return True
+		flush_saves() # so the files match what has been saved
+		try:
+			with open(INDEX_PATH) as index_file:
+				self.index = load(index_file)
+		except (OSError, ValueError):
+			# no index yet (or it can't be read), so every save is summarised again
+			self.index = {}
+
+		# saves the index doesn't match (made before there was an index, or changed
+		# outside of the game) are read once, to bring it up to date
+		slots = [file[4:-4] for file in os.listdir('saves') if file.startswith('save') and file.endswith('.txt')]
+		changed = False
+		for slot in list(self.index):
+			if slot not in slots:
+				del self.index[slot]
+				changed = True
+		for slot in slots:
+			stat = os.stat(save_path(slot))
+			summary = self.index.get(slot)
+			if not summary or summary['saved'] != stat.st_mtime_ns or summary['size'] != stat.st_size:
+				with open(save_path(slot)) as save_file:
+					self.index[slot] = self.summarise(load(save_file), stat.st_size, stat.st_mtime_ns)
+				changed = True
+		if changed:
+			self.write_index()
+
+	def write_index(self):
+		get_writer().write(INDEX_PATH, dumps(self.index).encode())
+
+	def check_for_saves(self):
+		# checks for existence of save files in saves directory
+		return len(self.get_index()) > 0
 
 	def count_used_slots(self):
 		# returns number of save files in saves directory
-		used_slots = 0
-		for file in os.listdir('saves'):
-			if file.endswith('.txt'):
-				used_slots += 1
-		return used_slots
+		return len(self.get_index())
 
 	def delete_save(self, slots_used):
-		# deletes selected save file
-		os.remove('saves/save'+self.save_slot+'.txt')
+		# deletes selected save file (once any saves still being written are done)
+		index = self.get_index()
+		flush_saves()
+		os.remove(save_path(self.save_slot))
+		del index[self.save_slot]
 		if slots_used > 1:
 			if self.save_slot == '1':
 				# if there is more than 1 save file and the 1st save is being deleted,
 				# rename 2nd save to be the 1st (to appear correctly in the load saves menu)
-				os.rename('saves/save2.txt', 'saves/save1.txt')
+				os.rename(save_path('2'), save_path('1'))
+				index['1'] = index.pop('2')
 			if slots_used == 3 and self.save_slot != '3':
 				# if 3 slots are in use and the user has deleted the 1st or 2nd save,
 				# rename the 3rd save to be the 2nd
-				os.rename('saves/save3.txt', 'saves/save2.txt')
\ No newline at end of file
+				os.rename(save_path('3'), save_path('2'))
+				index['2'] = index.pop('3')
+		self.write_index()
\ No newline at end of file
@@ -0,0 +1,93 @@
+import json
+
+from controls import InputSource
+
+REPLAY_VERSION = 2
+
+
+def game_summary(game):
+	# snapshot of the game's state, used to check that a replay ended
+	# exactly where its recording did
+	summary = {
+		'clock': game.game_clock.get_ticks(), # only moves on unpaused ticks, unlike the tick count
+		'state': game.state_label}
+	player = getattr(game.state, 'player', None)
+	if player:
+		summary['player'] = {
+			'center': list(player.rect.center),
+			'health': round(player.health, 3),
+			'stamina': round(player.stamina, 3),
+			'mana': round(player.mana, 3),
+			'wisps': player.stats['wisps'],
+			'dungeons': player.stats['dungeons']}
+	enemies = getattr(game.state, 'enemy_sprites', None)
+	if enemies is not None:
+		summary['enemies'] = sorted(
+			[list(enemy.rect.center), round(enemy.health, 3)] for enemy in enemies)
+	return summary
+
+
+class InputRecorder(InputSource):
+	'''
+	reads input like normal, but also keeps the controls held on every tick so
+	the session can be saved and replayed. inputs are stored as [controls, ticks]
+	runs, since the same controls are usually held for many ticks in a row
+	'''
+	def __init__(self, seed, start):
+		super().__init__()
+		self.seed = seed
+		self.start = start
+		self.ticks = 0
+		self.inputs = []
+
+	def poll(self):
+		super().poll()
+		self.ticks += 1
+		if self.inputs and self.inputs[-1][0] == self.bits:
+			self.inputs[-1][1] += 1
+		else:
+			self.inputs.append([self.bits, 1])
+
+	def save(self, path, final):
+		# writes the recording, along with the game's final state
+		data = {
+			'version': REPLAY_VERSION,
+			'seed': self.seed,
+			'start': self.start,
+			'ticks': self.ticks,
+			'inputs': self.inputs,
+			'final': final}
+		with open(path, 'w') as file:
+			json.dump(data, file, separators=(',', ':'))
+
+
+class InputReplay(InputSource):
+	'''
+	plays back the controls from a recording, tick by tick, in place of the
+	keyboard and mouse
+	'''
+	def __init__(self, path):
+		super().__init__()
+		with open(path) as file:
+			data = json.load(file)
+		if data['version'] != REPLAY_VERSION:
+			raise ValueError(f'unsupported replay version: {data["version"]}')
+		self.seed = data['seed']
+		self.start = data['start']
+		self.ticks = data['ticks']
+		self.final = data['final']
+		self.inputs = data['inputs']
+		self.run = 0 		# index of the current [controls, ticks] run
+		self.run_left = 0 	# ticks left in the current run
+
+	def read(self):
+		# moves on to the next run once the current one has been used up
+		while not self.run_left:
+			if self.run >= len(self.inputs):
+				return 0
+			self.run_left = self.inputs[self.run][1]
+			self.run += 1
+		self.run_left -= 1
+		if not self.run_left and self.run >= len(self.inputs):
+			self.finished = True # the recording's last tick
+		return self.inputs[self.run - 1][0]
@@ -3,13 +3,18 @@ from os import listdir
 from os.path import join
 
 # visual/display values
-FPS = 60
+FPS = 60 				# most frames drawn per second
 SCREEN_WIDTH = 1024
 MID_W = 512
 SCREEN_HEIGHT = 720
 MID_H = 360
 TILE_SIZE = 32
 
+# game timing - the game's logic runs at a fixed rate, no matter how quickly frames are drawn
+TICK_RATE = 60 			# game logic updates (ticks) per second
+TICK_TIME = 1 / TICK_RATE
+MAX_FRAME_TIME = 0.25 	# longest frame that ticks are run to catch up on (so slow frames can't snowball)
+
 # map creation values
 MAP_WIDTH = 64
 MAP_HEIGHT = 56
@@ -55,6 +60,13 @@ TILE_VALUES = {'2':[5,6], '8':[6,6], '10':[8,5],
 'X':[5,7], 'F':[4,7], 'plain':[1,7], 'edge':[2,7],
 'floor':[1,1]}
 
+# animation keys - the way a player faces and what they are doing are kept as
+# indexes, which pick out their frames from a table without building any strings
+FACINGS = ('up', 'down', 'left', 'right')
+FACE_UP, FACE_DOWN, FACE_LEFT, FACE_RIGHT = range(len(FACINGS))
+ACTIONS = ('', '_idle', '_sword', '_magic', '_dash') # suffix of each action's animation folder
+ACT_MOVE, ACT_IDLE, ACT_SWORD, ACT_MAGIC, ACT_DASH = range(len(ACTIONS))
+
 # player values
 DASH_STAMINA = 15 		# how much stamina a dash consumes
 MAGIC_MANA = 50 		# how much mana a magic attack consumes
@@ -68,16 +80,36 @@ ENEMY = {
 'attack radius': 60, 	# when within this distance from the player, enemy will attack
 'caution radius': 300}	# when within this distance from the player, enemy will follow player
 AOE_FADE_VAL = 255 / 43
+AI_BUDGET = 2 			# most time (ms) spent moving enemies and on their decisions each tick, before the rest wait a tick
+
+
+# images, fonts and animation folders are loaded the first time they're needed and
+# then kept for the whole run, so revisiting a state (or making another sprite of the
+# same kind) never goes back to the disk
+image_cache = {}
+font_cache = {}
+folder_cache = {}
+
+def load_image(path, alpha=True):
+	# the same surface is handed out every time, so anything that changes the
+	# image it gets back (e.g. fading it) should work on a copy
+	if (path, alpha) not in image_cache:
+		image = pygame.image.load(path)
+		image_cache[(path, alpha)] = image.convert_alpha() if alpha else image.convert()
+	return image_cache[(path, alpha)]
+
+
+def get_font(text_size):
+	if text_size not in font_cache:
+		font_cache[text_size] = pygame.font.Font(UI_FONT, text_size)
+	return font_cache[text_size]
 
 
 def import_folder(path):
 	# imports images for each animation, returns them as a list of surfaces
-	surf_list = []
-	for img in listdir(path):
-		full_path = join(path, img)
-		img_surf = pygame.image.load(full_path).convert_alpha()
-		surf_list.append(img_surf)
-	return surf_list
+	if path not in folder_cache:
+		folder_cache[path] = [load_image(join(path, img)) for img in listdir(path)]
+	return folder_cache[path]
 
 
 class Text:
@@ -85,7 +117,7 @@ class Text:
 	creates and renders text when text object instantiated
 	'''
 	def __init__(self,text,pos,text_size,colour,alpha=False):
-		self.font = pygame.font.Font(UI_FONT, text_size)
+		self.font = get_font(text_size)
 		self.text_surf = self.font.render(text, False, colour)
 		self.text_rect = self.text_surf.get_rect(center=pos)
 		if alpha:
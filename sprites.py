@@ -1,10 +1,15 @@
 import pygame
+from array import array
 from copy import deepcopy
 
 from settings import *
 from player_store import TempStore
 from attacks import AOE
+from collision import SpatialHashGroup
+from game_clock import get_ticks, get_tick_count
+from controls import held, UP, DOWN, LEFT, RIGHT, DASH, SWORD, MAGIC
 from math import cos
+from ai import ENEMY_STATES
 
 
 class Tile(pygame.sprite.Sprite):
@@ -12,12 +17,12 @@ class Tile(pygame.sprite.Sprite):
 	basic tile  class - used for all tile sprites
 	'''
 	def __init__(self, pos, surface, groups, depth=LAYERS['main'], type=None):
-		super().__init__(groups)
 		self.image = surface
 		self.rect = self.image.get_rect(topleft=pos)
 		self.depth = depth							# visual layer depth
 		self.hitbox = self.rect.inflate(0, -10)		# so that player sprite appears in front of tiles
 		self.type = type 							# some tiles have specific use, referred to using specific type
+		super().__init__(groups)					# added to groups last, as spatial groups index the hitbox
 
 
 class TileSheet:
@@ -26,15 +31,59 @@ class TileSheet:
 	'''
 	def __init__(self,filename):
 		# loads entire sheet (called only once, so that image doesnt have to be loaded multiple times)
-		self.sheet = pygame.image.load(filename).convert_alpha()
+		self.sheet = load_image(filename)
+		self.images = {} # pos on sheet: image, so each tile image is only extracted once
 
 	def get_image(self,pos_on_sheet):
 		# extracts tile from tilesheet (as subsurface), returns as image
-		image = self.sheet.subsurface(pygame.Rect(
-			(pos_on_sheet[0]-1)*TILE_SIZE,			# pos_on_sheet starts from 1 (easier to read) so decremented by 1,
-			(pos_on_sheet[1]-1)*TILE_SIZE, 			# then * tile size to reflect position of top left pixel on sheet
-			TILE_SIZE,TILE_SIZE))
-		return image
+		pos_on_sheet = tuple(pos_on_sheet)
+		if pos_on_sheet not in self.images:
+			self.images[pos_on_sheet] = self.sheet.subsurface(pygame.Rect(
+				(pos_on_sheet[0]-1)*TILE_SIZE,		# pos_on_sheet starts from 1 (easier to read) so decremented by 1,
+				(pos_on_sheet[1]-1)*TILE_SIZE, 		# then * tile size to reflect position of top left pixel on sheet
+				TILE_SIZE,TILE_SIZE))
+		return self.images[pos_on_sheet]
+
+
+class TileLayer:
+	'''
+	a layer of static tiles, stored as an image number for each cell instead of
+	a sprite (with its own rects and group dicts) for each tile. drawn one row at
+	a time, and only the rows and columns that are on screen
+	'''
+	def __init__(self, width, height, depth):
+		self.width = width
+		self.height = height
+		self.depth = depth 		# visual layer depth, the same for every tile in the layer
+		self.images = [] 		# each different tile image in the layer
+		self.image_index = {} 	# image: its number
+		self.cells = array('h', [-1]) * (width * height) # image number of each cell, -1 if empty
+
+	def set_tile(self, col, row, image):
+		if image not in self.image_index:
+			self.image_index[image] = len(self.images)
+			self.images.append(image)
+		self.cells[row * self.width + col] = self.image_index[image]
+
+	def get_tile(self, col, row):
+		# image in a cell, or None if it is empty
+		index = self.cells[row * self.width + col]
+		return self.images[index] if index != -1 else None
+
+	def visible(self, offset):
+		# ranges of rows and columns which are at least partly on screen
+		cols = range(max(0, int(offset[0]) // TILE_SIZE),
+			min(self.width, int(offset[0] + SCREEN_WIDTH) // TILE_SIZE + 1))
+		rows = range(max(0, int(offset[1]) // TILE_SIZE),
+			min(self.height, int(offset[1] + SCREEN_HEIGHT) // TILE_SIZE + 1))
+		return rows, cols
+
+	def draw_row(self, surface, row, cols, offset):
+		images, cells = self.images, self.cells
+		start = row * self.width
+		y = row * TILE_SIZE - offset[1]
+		surface.blits([(images[cells[start + col]], (col * TILE_SIZE - offset[0], y))
+			for col in cols if cells[start + col] != -1], False)
 
 
 class Entity(pygame.sprite.Sprite):
@@ -43,9 +92,11 @@ class Entity(pygame.sprite.Sprite):
 	'''
 	def __init__(self,groups):
 		super().__init__(groups)
-		self.frame_index = 0 					# animations begin on frame 0
-		self.animation_speed = 0.2
+		self.anim_start = get_tick_count() 		# tick the current animation started on (its frame 0)
+		self.animation_speed = 0.2 				# frames moved on each tick
 		self.direction = pygame.math.Vector2()  # used for movement direction
+		self.contact = (0, 0)					# normal of the surface last moved into, if any
+		self.last_center = None					# where the sprite was at the start of the last move
 
 	def move(self, speed):
 		if self.direction.magnitude() != 0:
@@ -53,31 +104,34 @@ class Entity(pygame.sprite.Sprite):
 			self.direction = self.direction.normalize()
 
 		# moves sprite (using hitbox) by multiplying the movement speed and the direction
-		self.hitbox.x += self.direction.x * speed
-		self.collision('x')
-		self.hitbox.y += self.direction.y * speed
-		self.collision('y')
+		self.move_by(self.direction.x * speed, self.direction.y * speed)
+
+	def move_by(self, dx, dy):
+		self.last_center = self.rect.center
+
+		# the hitbox is swept along the way, so it stops against the first wall it meets
+		# (and slides along it) no matter how fast the entity is moving
+		self.hitbox, self.contact = self.collision_map.sweep(self.hitbox, dx, dy)
 
 		# aligns sprite image with hitbox, as image not being moved - hitbox is
 		self.rect.center = self.hitbox.center
 
-	def collision(self, direction):
-		# checking the hitbox of the sprite against hitbox of entity
-		# so that entity cannot walk through walls
-
-		for sprite in self.collision_sprites:
-			if sprite.hitbox.colliderect(self.hitbox):
-				# loops through every sprite hitbox, checks if colliding with entity
-				if direction == 'x':
-					if self.direction.x > 0:  					# moving right
-						self.hitbox.right = sprite.hitbox.left
-					if self.direction.x < 0:  					# moving left
-						self.hitbox.left = sprite.hitbox.right
-				elif direction == 'y':
-					if self.direction.y > 0:  					# moving down
-						self.hitbox.bottom = sprite.hitbox.top
-					if self.direction.y < 0:  					# moving up
-						self.hitbox.top = sprite.hitbox.bottom
+		# keeps any spatial index the sprite is in up to date with its new position
+		for group in self.groups():
+			if isinstance(group, SpatialHashGroup):
+				group.relocate(self)
+
+	def interpolated_rect(self, alpha):
+		# rect of the sprite partway (by alpha) between where it was before its last
+		# move and where it is now - frames are drawn between game ticks, so this
+		# keeps movement smooth when the frame rate and tick rate don't line up
+		if self.last_center is None:
+			return self.rect
+		rect = self.rect.copy()
+		rect.center = (
+			self.last_center[0] + (self.rect.centerx - self.last_center[0]) * alpha,
+			self.last_center[1] + (self.rect.centery - self.last_center[1]) * alpha)
+		return rect
 
 	def import_assets(self, path):
 		# imports list of surfaces (images) for each animation, stored in
@@ -86,53 +140,57 @@ class Entity(pygame.sprite.Sprite):
 			full_path = path + animation
 			self.animations[animation] = import_folder(full_path)
 
+	def build_frame_table(self):
+		# frames for every facing and action, so the current animation is found by
+		# index rather than by putting its name together - used by Player and ExamplePlayer
+		self.frame_table = [self.animations.get(facing + action)
+			for facing in FACINGS for action in ACTIONS]
+
+	@property
+	def animation_id(self):
+		# index of the current animation in the frame table
+		return self.facing * len(ACTIONS) + self.action
+
 	def get_state(self):
 		# changes state according to current move - used by Player and ExamplePlayer
 		# enemy uses different get_state method
 
 		if self.direction.x == 0 and self.direction.y == 0:
 			# not moving
-			if not any(state in self.state for state in self.action_states):
+			if self.action == ACT_MOVE:
 				# not performing any action, reset state to idle
-				self.state = self.state + '_idle'
+				self.action = ACT_IDLE
 				return
 
 		# checks other possible actions that could be performed
-		action_map = {
-		'_sword': self.sword, '_dash': self.dashing, '_magic': self.magic}
-		for state, action in action_map.items():
-			self.change_state(state, action)
+		self.change_state(ACT_SWORD, self.sword)
+		self.change_state(ACT_DASH, self.dashing)
+		self.change_state(ACT_MAGIC, self.magic)
 
-	def change_state(self, state, is_current):
+	def change_state(self, action, is_current):
 		# changes state in accordance with get_state - used by Player and ExamplePlayer
 
 		if is_current:
-			# if the action is being performed
-			if not state in self.state:
-				# if the state mapped to the action is not the player's current state
-				for s in self.action_states:
-					# check through possible states
-					if s in self.state:
-						# if current searched state is one that is in the possible states
-						# replace current state with state that player should be in
-						self.state = self.state.replace(s,state)
-						break
-				else:
-					self.state += state
-		else:
-			# no action being performed
-			if state in self.state:
-				# but player still in state of action (sword,dash,magic)
-				self.state = self.state.replace(state,'')
+			# the action being performed replaces whatever the player was doing
+			self.action = action
+		elif self.action == action:
+			# no action being performed, but player still in state of action (sword,dash,magic)
+			self.action = ACT_MOVE
+
+	def restart_animation(self):
+		self.anim_start = get_tick_count()
+
+	def current_frame(self):
+		# frame of the current animation, worked out from the game's tick count rather
+		# than a frame index counted up by every sprite on every tick
+		animation = self.frame_table[self.animation_id]
+		# % len(animation) ensures that index does not exceed number of animation frames
+		return animation[int((get_tick_count() - self.anim_start) * self.animation_speed) % len(animation)]
 
 	def animate(self):
-		# animates the sprite's current state - used by Player and Enemy
-		# ExamplePlayer uses slightly altered version
-
-		animation = self.animations[self.state]
-		self.frame_index = (self.frame_index + self.animation_speed) % len(animation)
-		# % len(animation) ensures that index does not exceed number of animation frames
-		self.image = animation[int(self.frame_index)]
+		# animates the sprite's current state - used by Player
+		# ExamplePlayer uses slightly altered version, and enemies only pick a frame when drawn
+		self.image = self.current_frame()
 		self.rect = self.image.get_rect(center=self.hitbox.center)
 
 
@@ -140,7 +198,7 @@ class Player(Entity):
 	'''
 	the player character which is controllable by the user
 	'''
-	def __init__(self, pos, groups, collision_sprites, create_atk, destroy_atk, data_store, stamina_warning):
+	def __init__(self, pos, groups, collision_map, create_atk, destroy_atk, data_store, stamina_warning, timers):
 		super().__init__(groups)
 
 		# importing player data
@@ -155,14 +213,15 @@ class Player(Entity):
 
 		# graphics
 		self.import_assets('graphics/player/')
-		self.state = 'down'
-		self.action_states = ['_idle','_sword','_magic','_dash']
-		self.image = self.animations[self.state][self.frame_index]
+		self.build_frame_table()
+		self.facing = FACE_DOWN
+		self.action = ACT_MOVE
+		self.image = self.current_frame()
 
 		# collisions and visuals
 		self.rect = self.image.get_rect(topleft=pos)
 		self.hitbox = self.rect.inflate(-2, -14)	# smaller hitbox for player sprite to overlap with tiles
-		self.collision_sprites = collision_sprites	# 
+		self.collision_map = collision_map			# obstacles the player cannot walk through
 		self.depth = LAYERS['main']
 		self.pos = pygame.math.Vector2(self.rect.center)
 
@@ -170,27 +229,25 @@ class Player(Entity):
 		self.create_atk = create_atk			# called when player performs attack
 		self.destroy_atk = destroy_atk 			# called when player attack is finished
 		self.stamina_warning = stamina_warning 	# called when player is too low on stamina to dash
+		self.timers = timers 					# ends actions once their duration is up
 
 		# sword
 		self.sword = False
-		self.atk_time = 0 			# time since last sword attack
 		self.atk_duration = 360
 
 		# magic
 		self.magic = False
-		self.magic_time = 0 		# time since last magic attack
 		self.magic_duration = 420
 
 		# dash
 		self.dashing = False
-		self.dash_time = 0 			# time since last dash
 		self.dash_distance = 80
 		self.dash_duration = 200
 
 		# vulnerability
 		self.vulnerable = True
-		self.hit_time = 0 			# time since last taken damage
 		self.invul_duration = 400
+		self.invul_timer = None 	# timer ending invulnerability after taking damage
 
 		# maximum values that stats can reach
 		self.max_stats = {
@@ -224,57 +281,59 @@ class Player(Entity):
 		self.data_store.update_current(self.stats)
 
 	def input(self):
-		# get player input
-		keys = pygame.key.get_pressed()
-		mouse = pygame.mouse.get_pressed()
+		# get player input (read once per tick by the game loop)
 
 		if not self.sword and not self.magic:
 			# so player cannot change direction when attacking
 
 			# vertical movement
-			if keys[pygame.K_w]:
+			if held(UP):
 				self.direction.y = -1
-				self.state = 'up'
-			elif keys[pygame.K_s]:
+				self.facing = FACE_UP
+				self.action = ACT_MOVE
+			elif held(DOWN):
 				self.direction.y = 1
-				self.state = 'down'
+				self.facing = FACE_DOWN
+				self.action = ACT_MOVE
 			else:
 				self.direction.y = 0
 
 			# horizontal movement
-			if keys[pygame.K_a]:
+			if held(LEFT):
 				self.direction.x = -1
-				self.state = 'left'
-			elif keys[pygame.K_d]:
+				self.facing = FACE_LEFT
+				self.action = ACT_MOVE
+			elif held(RIGHT):
 				self.direction.x = 1
-				self.state = 'right'
+				self.facing = FACE_RIGHT
+				self.action = ACT_MOVE
 			else:
 				self.direction.x = 0
 
 			# sword attack
-			if mouse[0]:
+			if held(SWORD):
 				self.sword = True
-				self.atk_time = pygame.time.get_ticks()
+				self.timers.after(self.atk_duration, self.end_sword)
 				self.create_atk('sword')
-				self.frame_index = 0
+				self.restart_animation()
 
 			# magic attack
-			if mouse[2]:
+			if held(MAGIC):
 				if self.mana >= MAGIC_MANA:
 					self.magic = True
-					self.magic_time = pygame.time.get_ticks()
+					self.timers.after(self.magic_duration, self.end_magic)
 					self.create_atk('magic')
-					self.frame_index = 0
+					self.restart_animation()
 					self.mana -= MAGIC_MANA
 
 			# dash
-			if keys[pygame.K_SPACE] and not self.dashing:
+			if held(DASH) and not self.dashing:
 				if self.stamina >= DASH_STAMINA:
 					if self.dash_collision_rect():
 						self.dashing = True
-						self.dash_time = pygame.time.get_ticks()
+						self.timers.after(self.dash_duration, self.end_dash)
 						self.vulnerable = False
-						self.frame_index = 0
+						self.restart_animation()
 						self.stamina -= DASH_STAMINA
 				else:
 					self.stamina_warning('on_press')
@@ -284,16 +343,16 @@ class Player(Entity):
 			# direction (makes aligning attack hitboxes simpler)
 
 			# vertical movement
-			if keys[pygame.K_w]:
+			if held(UP):
 				self.direction.y = -1
-			elif keys[pygame.K_s]:
+			elif held(DOWN):
 				self.direction.y = 1
 			else:
 				self.direction.y = 0
 			# horizontal movement
-			if keys[pygame.K_a]:
+			if held(LEFT):
 				self.direction.x = -1
-			elif keys[pygame.K_d]:
+			elif held(RIGHT):
 				self.direction.x = 1
 			else:
 				self.direction.x = 0
@@ -305,51 +364,18 @@ class Player(Entity):
 			# can't dash, as player not moving in any direction
 			return False
 
-		# creates one/two rects which cover the length of the player's dash
-		# used to check if there are no obstructions in the dash path
-		y_check = pygame.Rect((-100,-100),(
-			self.hitbox.width,self.dash_distance))
-		x_check = pygame.Rect((-100,-100),(
-			self.dash_distance,self.hitbox.height))
-
-		# aligning the collision checker(s) with player hitbox
-		if self.direction.x > 0:
-			x_check.topleft = self.hitbox.topright
-		elif self.direction.x < 0:
-			x_check.topright = self.hitbox.topleft
-		if self.direction.y > 0:
-			y_check.topleft = self.hitbox.bottomleft
-		elif self.direction.y < 0:
-			y_check.bottomleft = self.hitbox.topleft
-
-		# joining separate rects / renaming single direction checks for simplicity
-		if self.direction.x != 0 and self.direction.y != 0:
-			full_check = x_check.union(y_check)
-			# union of rects fills diagonal space dash space
-		else:
-			if self.direction.x != 0:
-				full_check = x_check.copy()
-			elif self.direction.y != 0:
-				full_check = y_check.copy()
-
-		# checking for collisions between check rect and collision sprites
-		can_dash = True
-		for sprite in self.collision_sprites:
-			if sprite.hitbox.colliderect(full_check):
-				can_dash = False
-
-		# aligning player hitbox to collision checker
-		if can_dash:
-			if self.direction.x > 0:
-				self.hitbox.right = full_check.right
-			elif self.direction.x < 0:
-				self.hitbox.left = full_check.left
-			if self.direction.y > 0:
-				self.hitbox.bottom = full_check.bottom
-			elif self.direction.y < 0:
-				self.hitbox.top = full_check.top
-
-		return can_dash
+		# sweeps the player hitbox the length of the dash in each direction they are
+		# moving in - if an obstruction is in the way, the dash stops short against it
+		dashed, contact = self.collision_map.sweep(self.hitbox,
+			self.direction.x * self.dash_distance, self.direction.y * self.dash_distance)
+
+		if dashed == self.hitbox:
+			# already against an obstruction, so there is nowhere to dash to
+			return False
+
+		# aligning player hitbox with the end of the dash
+		self.hitbox = dashed
+		return True
 
 	def change_speed(self):
 		# player movement speed changed when performing an attack
@@ -365,31 +391,31 @@ class Player(Entity):
 			dmg += MAGIC_DMG
 		return dmg
 
-	def cooldowns(self):
-		# checks if an action should still be being performed by 
-		# calculating the time since the move was first performed and
-		# comparing that to its defined duration
-
-		current_time = pygame.time.get_ticks()
+	# actions are ended by timers once their duration is up, rather than
+	# comparing against the time they started on every tick
+	def end_sword(self):
+		self.destroy_atk()
+		self.sword = False
 
-		if self.sword:
-			if current_time - self.atk_time >= self.atk_duration:
-				self.destroy_atk()
-				self.sword = False
+	def end_magic(self):
+		self.destroy_atk()
+		self.magic = False
 
-		elif self.dashing:
-			if current_time - self.dash_time >= self.dash_duration:
-				self.dashing = False
-				self.vulnerable = True
+	def end_dash(self):
+		self.dashing = False
+		self.vulnerable = True
 
-		elif self.magic:
-			if current_time - self.magic_time >= self.magic_duration:
-				self.destroy_atk()
-				self.magic = False
+	def end_invulnerability(self):
+		self.vulnerable = True
 
-		if not self.vulnerable:
-			if current_time - self.hit_time >= self.invul_duration:
-				self.vulnerable = True
+	def get_hurt(self, damage):
+		# player can't keep repeatedly taking damage within certain amount of time
+		# (gets recovery time)
+		self.health -= damage
+		self.vulnerable = False
+		if self.invul_timer:
+			self.invul_timer.cancel()
+		self.invul_timer = self.timers.after(self.invul_duration, self.end_invulnerability)
 
 	def recovery(self):
 		# gradual recovery of player stats
@@ -404,25 +430,20 @@ class Player(Entity):
 			self.mana += self.stats['mana']
 
 	def on_hit(self):
-		# player flickers when invulnerable except for when dashing
-		if not self.vulnerable and not self.dashing:
-			value = cos(pygame.time.get_ticks())
-			# if value from cos graph at current point of time is positive
-			if value >= 0:
-				self.image.set_alpha(255)
-			else:
-				self.image.set_alpha(0)
-		else:
-			self.image.set_alpha(255)
+		# player flickers when invulnerable except for when dashing - hidden while the
+		# value from the cos graph at the current point of time is negative. frames are
+		# shared with every player (and example) made this run, so a copy is hidden
+		if not self.vulnerable and not self.dashing and cos(get_ticks()) < 0:
+			self.image = self.image.copy()
+			self.image.set_alpha(0)
 
 	def update(self):
 		self.input()
-		self.on_hit()
 		self.stamina_warning('check')
-		self.cooldowns()
 		self.get_state()
 		self.change_speed()
 		self.animate()
+		self.on_hit() # after animating, which picks the frame to flicker
 		self.move(self.speed)
 		self.recovery()
 
@@ -432,7 +453,7 @@ class ExamplePlayer(Entity):
 	used in tutorial to show player various moves that can be performed
 	comments made where differences between regular player and exampleplayer are
 	'''
-	def __init__(self, pos, groups, example_type, magic_atk, destroy_atk):
+	def __init__(self, pos, groups, example_type, magic_atk, destroy_atk, timers):
 		super().__init__(groups)
 
 		# animations - less animations need to be imported as examples only face one direction
@@ -441,10 +462,11 @@ class ExamplePlayer(Entity):
 
 		# graphics
 		self.import_assets('graphics/player/')
+		self.build_frame_table()
 		self.example_type = example_type
-		self.state = 'down_idle'
-		self.action_states = ['_idle','_sword','_magic','_dash']
-		self.image = self.animations[self.state][self.frame_index]
+		self.facing = FACE_DOWN
+		self.action = ACT_IDLE
+		self.image = self.current_frame()
 		self.image = pygame.transform.scale_by(self.image, 2)	# scaled the image for better visibility	
 
 		# collisions and visuals
@@ -452,100 +474,87 @@ class ExamplePlayer(Entity):
 		self.hitbox = self.rect.inflate(-2, -14)
 		self.depth = LAYERS['main']
 		self.pos = pygame.math.Vector2(self.rect.center)
-		self.last_action = 0
+		self.timers = timers
 		self.between_actions = 1000
 
 		# sword
 		self.sword = False 
-		self.atk_time = 0
 		self.atk_duration = 360
 
 		# magic
 		self.magic_atk = magic_atk
 		self.destroy_atk = destroy_atk
 		self.magic = False
-		self.magic_time = 0
 		self.magic_duration = 420
 
 		# dash
 		self.dashing = False
-		self.dash_time = 0
 		self.dash_duration = 200
 
 		# movement
 		self.speed = 4
 
+		# examples repeat their move indefinitely, once every between_actions ms
+		# (each move is over before the next one starts)
+		if self.example_type != 'move':
+			self.timers.every(self.between_actions, self.perform_action)
+
 	def example(self):
 		# replaces input method from player class
-
 		if self.example_type == 'move':
 			self.direction.y = 1
-			self.state = 'down'
-
-		if self.action_cooldown():
-			if not self.sword and not self.magic and not self.dashing:
-				self.last_action = pygame.time.get_ticks()
+			self.action = ACT_MOVE
 
-				if self.example_type == 'sword':
-					self.sword = True
-					self.atk_time = pygame.time.get_ticks()
+	def perform_action(self):
+		if self.example_type == 'sword':
+			self.sword = True
+			self.timers.after(self.atk_duration, self.end_sword)
 
-				elif self.example_type == 'magic':
-					self.magic = True
-					self.magic_time = pygame.time.get_ticks()
-					self.magic_atk()
+		elif self.example_type == 'magic':
+			self.magic = True
+			self.timers.after(self.magic_duration, self.end_magic)
+			self.magic_atk()
 
-				elif self.example_type == 'dash':
-					self.direction.y = 1
-					self.dashing = True
-					self.dash_time = pygame.time.get_ticks()
+		elif self.example_type == 'dash':
+			self.direction.y = 1
+			self.dashing = True
+			self.timers.after(self.dash_duration, self.end_dash)
 
 	def animate(self):
-		animation = self.animations[self.state]
-		self.frame_index = (self.frame_index + self.animation_speed) % len(animation)
-		self.image = animation[int(self.frame_index)]
-		self.image = pygame.transform.scale_by(self.image, 2)		# scales image so example more visible
+		self.image = pygame.transform.scale_by(self.current_frame(), 2)		# scales image so example more visible
 		self.rect = self.image.get_rect(center=self.hitbox.center)
 
-	def action_cooldown(self):
-		# examples repeat moves indefinitely, only need to know how long to
-		# wait until next attack can be performed
-		current_time = pygame.time.get_ticks()
-		if current_time - self.last_action < self.between_actions:
-			return False
-		return True
-
-	def cooldowns(self):
-		current_time = pygame.time.get_ticks()
-
-		if self.sword:
-			if current_time - self.atk_time >= self.atk_duration:
-				self.sword = False
+	def end_sword(self):
+		self.sword = False
 
-		if self.dashing:
-			if current_time - self.dash_time >= self.dash_duration:
-				self.dashing = False
+	def end_dash(self):
+		self.dashing = False
 
-		if self.magic:
-			if current_time - self.magic_time >= self.magic_duration:
-				self.destroy_atk()
-				self.magic = False
+	def end_magic(self):
+		self.destroy_atk()
+		self.magic = False
 
 	def update(self):
 		# doesn't take player input or check for collisions, 
 		# as player cannot control the example characters
 		self.example()
-		self.cooldowns()
 		self.get_state()
 		self.animate()
 
 
 class Enemy(Entity):
 	'''
-	enemies which player can attack / get hit by in dungeon
+	enemies which player can attack / get hit by in dungeon. their ai state lives
+	in a slot of the shared EnemyBatch, which runs every enemy's ai in one pass -
+	the sprite itself is left to animate, draw and collide. its image is only
+	picked out when the camera draws it, so enemies off screen cost nothing to
+	animate
 	'''
-	def __init__(self, pos, groups, collision_sprites, all_sprites, dmg_player, heal_player, add_wisps):
-		super().__init__(groups)
+	def __init__(self, pos, groups, collision_map, batch, all_sprites, dmg_player, heal_player, add_wisps):
+		# slot taken first, as Entity sets the direction (which is stored in the batch)
+		self.batch = batch
+		self.slot = batch.add(self)
+		super().__init__(()) # groups joined once rects exist, as spatial groups index them
 		
 		# animations
 		self.animations = {'idle': [], 'move': [],'attack': [], 
@@ -553,24 +562,20 @@ class Enemy(Entity):
 
 		# graphics
 		self.import_assets('graphics/enemy/')
-		self.state = 'idle'
-		self.image = self.animations[self.state][self.frame_index]
+		self.frame_table = [self.animations[state] for state in ENEMY_STATES]
 		self.depth = LAYERS['main']
 
-		# movement and collisions
-		self.rect = self.image.get_rect(topleft=pos)
+		# movement and collisions - every enemy frame is the same size, so the rect
+		# is kept rather than fitted to each frame
+		self.rect = self.current_frame().get_rect(topleft=pos)
 		self.hitbox = self.rect.copy()
-		self.collision_sprites = collision_sprites
+		self.collision_map = collision_map 			# walls and corridors, which enemies can't enter
 		self.all_sprites = all_sprites
-		self.obstacles = None 						# list of tiles which obstruct enemy vision
+		self.add(groups)
+		batch.place(self.slot, self.hitbox.center)
 
 		# enemy data
 		self.type = 'enemy'
-		self.health = ENEMY['health']
-		self.attack = ENEMY['attack']
-		self.speed = ENEMY['speed'] 
-		self.atk_radius = ENEMY['attack radius'] 	# distance from player which enemy will attempt to attack at
-		self.ctn_radius = ENEMY['caution radius'] 	# disance from player which enemy will follow player at
 		self.return_pos = pos 	# position which enemy will return to when player is out of range
 
 		# state functions
@@ -579,177 +584,66 @@ class Enemy(Entity):
 		self.add_wisps = add_wisps
 		self.aoe_attack = None
 
-		# attacking
-		self.atk_time = 0			# time since last attack
-		self.atk_cooldown = 800		# time to cool down after attack
-		self.prepared = False		# attack has been prepared
-		self.prep_time = 0 			# time since started preparing
-		self.full_prep = 700		# amount of time it takes to fully prep attack
-
-		# vulnerability
-		self.vulnerable = True 		# can take damage
-		self.invul_time = 0 		# time since last hit
-		self.invul_duration = 560 	# duration of invulnerability
-
-	def get_dist_dir(self, pos):
-		# returns the distance and direction of a point pos from enemy's position
-		enemy_vec = pygame.math.Vector2(self.rect.center)
-		end_vec = pygame.math.Vector2(pos)
-		distance = enemy_vec.distance_to(end_vec)
-
-		if distance:
-			# gets direction towards point from enemy's current point
-			direction = (end_vec - enemy_vec).normalize()
-		else:
-			# clear direction, not moving in any direction
-			direction = pygame.math.Vector2()
-
-		return distance, direction
-
-	def get_state(self, player):
-		# changes state in accordance with own state and distance to player
-
-		dist_to_player = self.get_dist_dir(player.rect.center)[0]
-		if self.state != 'return' and self.can_atk():
-			# if enemy not returning to initial positon and is able to attack
-		    if self.prepared and self.state != 'attack':
-		    	# if ready to attack but not in attack state, switch, regardless
-		    	# of if player in range or not
-		    	self.state = 'attack'
-		    elif self.state != 'attack_prepare':
-		    	# cannot be broken out of attack prep state once started
-		        if dist_to_player <= self.atk_radius and not self.prepared:
-		        	self.state = 'attack_prepare'
-		        	self.prep_time = pygame.time.get_ticks()
-		        	# get time when attack started being prepped
-		        	self.aoe_attack = AOE(self.rect.center, self.all_sprites)
-		        elif dist_to_player <= self.ctn_radius:
-		        	# player in notice range, move towards them (to get in attack range)
-		        	self.state = 'move'
-		        else:
-		        	# if player out of range, check if at original position
-		        	if not self.rect.collidepoint(self.return_pos):
-		        		# return to spawn position
-		        		self.state = 'return'
-		        	else:
-		        		# stay idle at spawn position
-		        		self.state = 'idle'
-		else:
-			if not self.can_atk():
-				# cooling down after attack, can't move
-				self.state = 'attack_idle'
-			else:
-				if self.rect.collidepoint(self.return_pos):
-					# at spawn pos, don't need to move
-					self.state = 'idle'
-
-		if self.state in ['attack','attack_idle','attack_prepare','move']:
-			if self.check_obstructed(player):
-				# regardless of state, enemies get 'bored' if player obstructed
-				# from view or leaves room
-				if not self.rect.collidepoint(self.return_pos):
-					self.state = 'return'
-				else:
-					self.state = 'idle'
-
-	def state_action(self,player):
-		# changes certain things depending on current enemy state
-
-		# setting direction
-		if self.state == 'move':
-			# move towards player
-			self.direction = self.get_dist_dir(player.rect.center)[1]
-		elif self.state == 'return':
-			# return to start position
-			self.direction = self.get_dist_dir(self.return_pos)[1]
+	# enemy data is kept in the batch's arrays - these read and write this enemy's slot
+	@property
+	def animation_id(self):
+		# enemy states are already stored as indexes into ENEMY_STATES
+		return self.batch.state[self.slot]
+
+	@property
+	def image(self):
+		# entity flickers when invulnerable - visible while the value from the cos
+		# graph at the current point of time is positive
+		image = self.current_frame()
+		if not self.vulnerable and cos(get_ticks()) < 0:
+			image.set_alpha(0)
 		else:
-			# unmoving in other states
-			self.direction = pygame.math.Vector2()
-
-		if self.state == 'attack':
-			# check attack time and dmg player if in vicinity
-			self.atk_time = pygame.time.get_ticks()
-			self.prepared = False
-			if self.get_dist_dir(player.rect.center)[0] <= self.atk_radius:
-				self.dmg_player()
-
-	def check_obstructed(self, player):
-		# checks that no wall tiles are obstructing the enemy's view of the player
-		enemy_pos = self.rect.center
-		player_pos = player.rect.center
-
-		if not self.obstacles:
-			# creates list of sprites which obstruct the view of the enemy (walls and corridors)
-			# using list comprehension, only done once so list not made for every check
-			self.obstacles = [sprite for sprite in self.collision_sprites if hasattr(
-				sprite, 'type') and (sprite.type == 'wall' or sprite.type == 'corridor')]
-		
-		for sprite in self.obstacles:
-			if sprite.hitbox.clipline((enemy_pos,player_pos)):
-				# draws line between enemy center and player center - if line touches 
-				# obstacle sprite, enemy loses interest in player as it cannot see them
-				return True
-			# enemy can still see player
-		return False
+			image.set_alpha(255)
+		return image
+
+	@property
+	def health(self):
+		return self.batch.health[self.slot]
+
+	@health.setter
+	def health(self, health):
+		self.batch.health[self.slot] = health
+
+	@property
+	def vulnerable(self):
+		return bool(self.batch.vulnerable[self.slot])
+
+	@vulnerable.setter
+	def vulnerable(self, vulnerable):
+		self.batch.vulnerable[self.slot] = vulnerable
+
+	@property
+	def direction(self):
+		return pygame.math.Vector2(self.batch.dir_x[self.slot], self.batch.dir_y[self.slot])
+
+	@direction.setter
+	def direction(self, direction):
+		self.batch.dir_x[self.slot], self.batch.dir_y[self.slot] = direction
+
+	def prepare_attack(self):
+		# shows where the attack will land while it is being prepared
+		self.aoe_attack = AOE(self.rect.center, self.all_sprites)
 
 	def get_hurt(self, player, atk_type):
 		# called when player attack collides with enemy hitbox
 		if self.vulnerable:
 			self.vulnerable = False
 			self.health -= player.get_atk_dmg(atk_type)
-			self.invul_time = pygame.time.get_ticks()
-			
-	def can_atk(self):
-		# checks if enough time has passed since the last attack was performed
-		current_time = pygame.time.get_ticks()
-		if current_time - self.atk_time >= self.atk_cooldown:
-			return True
-		return False
-
-	def cooldowns(self):
-		current_time = pygame.time.get_ticks()
-
-		# counts for how long attack should be building up for
-		if self.state == 'attack_prepare' and not self.prepared:
-			if current_time - self.prep_time >= self.full_prep:
-				self.prepared = True
-
-		# counts for how long enemy should be invulnerable to attacks (after hit)
-		if not self.vulnerable:
-			if current_time - self.invul_time >= self.invul_duration:
-				self.vulnerable = True
-				self.image.set_alpha(255)
-
-	def check_death(self):
-		if self.health <= 0:
-			self.kill()
-			self.heal_player()
-			self.add_wisps()
-			if self.aoe_attack:
-				self.aoe_attack.kill()
+			self.batch.wake(self.slot)
+			self.batch.timers.after(self.batch.invul_duration, self.end_invulnerability)
 
-	def on_hit(self):
-		# entity flickers when invulnerable
-		if not self.vulnerable:
-			value = cos(pygame.time.get_ticks())
-			# if value from cos graph at current point of time is positive
-			if value >= 0:
-				# set image to visible
-				self.image.set_alpha(255)
-			else:
-				# else set image to invisible
-				self.image.set_alpha(0)
-		else:
-			self.image.set_alpha(255)
-
-	def update(self):
-		self.on_hit()
-		self.move(self.speed)
-		self.animate()
-		self.cooldowns()
-		self.check_death()
+	def end_invulnerability(self):
+		self.vulnerable = True
 
-	def enemy_update(self, player):
-		# specific update method which changes enemy state using player location
-		self.get_state(player)
-		self.state_action(player)
+	def die(self):
+		self.kill()
+		self.batch.remove(self.slot)
+		self.heal_player()
+		self.add_wisps()
+		if self.aoe_attack:
+			self.aoe_attack.kill()
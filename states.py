@@ -1,13 +1,17 @@
 import pygame
 
 from settings import *
-from dun_gen import get_dungeon
-from sprites import Tile, TileSheet, ExamplePlayer, Player, Enemy
-from camera import ForestCameraGroup, DungeonCameraGroup
-from pause_menu import Stats, General, Check, SaveCheck, UpgradeCheck, NoUpgrade
+from sprites import Tile, TileSheet, TileLayer, ExamplePlayer, Player, Enemy
+from ai import EnemyBatch, AIScheduler
+from camera import ForestCameraGroup, DungeonCameraGroup, StaticGroup
+from collision import SpatialHashGroup, TileGrid, LineOfSight
+from pause_menu import MenuPages, Stats, General, Check, SaveCheck, UpgradeCheck, NoUpgrade
 from buttons import Tab, GenButton, PromptButton, MainMenuButton, SaveButton, SmallButton
 from attacks import Sword, Magic
 from overlay import Overlay, TextBubble
+from navigation import Navigator
+from timers import TimerScheduler
+from controls import held, pressed, INTERACT
 
 class State:
 	'''
@@ -19,6 +23,15 @@ class State:
 		self.next = None			# next scene in sequence
 		self.mouse_visible = False 	# mouse visible only when paused
 
+	def update(self):
+		# advances the state by one tick of game time (menus have nothing to advance)
+		pass
+
+	def draw(self, alpha=1):
+		# draws the state - alpha is how far between the last tick and the next
+		# the frame is being drawn, used to smooth movement
+		pass
+
 
 class TitleState(State):
 	'''
@@ -42,6 +55,8 @@ class TitleState(State):
 	def update(self):
 		# state updater
 		self.text.update_alpha()
+
+	def draw(self, alpha=1):
 		self.text.draw(self.display_surface)
 
 	def event_handler(self, event, data_store=None, paused=False):
@@ -95,7 +110,7 @@ class MainMenuState(State):
 			self.load_game = MainMenuButton(
 				self.buttons, (MID_W,MID_H), 'load game')
 
-	def update(self):
+	def draw(self, alpha=1):
 		self.display_surface.fill(CYAN)
 		for button in self.buttons:
 			button.custom_draw()
@@ -179,7 +194,7 @@ class NewGameCheckState(State):
 				(MID_W, MID_H + 24), 
 				TEXT_M, WHITE))
 
-	def update(self):
+	def draw(self, alpha=1):
 		self.display_surface.fill(CYAN)
 		for text in self.text:
 			text.draw(self.display_surface)
@@ -229,12 +244,13 @@ class LoadSaveState(State):
 		self.mouse_visible = True
 		pygame.mouse.set_visible(self.mouse_visible)
 
-		self.bg = pygame.image.load('graphics/ui/backgrounds/save_load.png').convert()
+		self.bg = load_image('graphics/ui/backgrounds/save_load.png', alpha=False)
 		self.bg_rect = self.bg.get_rect()
 
 		self.buttons = pygame.sprite.Group()
 		self.create_btns(data_store)
 		self.text = []
+		self.shown_slot = None 	# slot whose save info is on screen
 
 	def create_btns(self, data_store):
 		self.return_btn = SmallButton(
@@ -266,23 +282,30 @@ class LoadSaveState(State):
 		mouse_pos = pygame.mouse.get_pos()
 		if event.type == pygame.MOUSEBUTTONDOWN:
 
+			# a save is only read once it's chosen
 			if self.s1.on_click(mouse_pos):
+				data_store.import_save('1')
 				self.done = True
 			if self.s1_delete.on_click(mouse_pos):
+				data_store.select_save('1')
 				self.next = 'delete'
 				self.done = True
 
 			if self.slots > 1:
 				if self.s2.on_click(mouse_pos):
+					data_store.import_save('2')
 					self.done = True
 				if self.s2_delete.on_click(mouse_pos):
+					data_store.select_save('2')
 					self.next = 'delete'
 					self.done = True
 
 				if self.slots > 2:
 					if self.s3.on_click(mouse_pos):
+						data_store.import_save('3')
 						self.done = True
 					if self.s3_delete.on_click(mouse_pos):
+						data_store.select_save('3')
 						self.next = 'delete'
 						self.done = True
 
@@ -297,25 +320,26 @@ class LoadSaveState(State):
 
 		for button in self.buttons:
 			if button.on_hover(mouse_pos) and button.hover_data:
-				data_store.import_save(button.hover_data)
-				self.display_save_info(data_store)
+				if button.hover_data != self.shown_slot:
+					self.display_save_info(button.hover_data, data_store.get_index()[button.hover_data])
 
-	def display_save_info(self, data_store):
+	def display_save_info(self, slot, summary):
 		# displays most recently hovered save button's save data on screen
-
+		# (taken from the save index, rather than from the save itself)
+		self.shown_slot = slot
 		self.text = []
-		self.text.append(Text('save slot ' + data_store.save_slot + ': ', 
+		self.text.append(Text('save slot ' + slot + ': ', 
 			(170,650), 
 			TEXT_S, WHITE))
 		self.text.append(Text('dungeons completed: ' + str(
-			data_store.save_data['dungeons']), 
+			summary['dungeons']), 
 			(MID_W,650), 
 			TEXT_S, WHITE))
-		self.text.append(Text('wisps: ' + str(data_store.save_data['wisps']), 
+		self.text.append(Text('wisps: ' + str(summary['wisps']), 
 			(854,650), 
 			TEXT_S, WHITE))
 
-	def update(self):
+	def draw(self, alpha=1):
 		self.display_surface.blit(self.bg,self.bg_rect)
 		for text in self.text:
 			text.draw(self.display_surface)
@@ -384,7 +408,7 @@ class DeleteSaveState(State):
 		for button in self.buttons:
 			button.on_hover(mouse_pos)
 
-	def update(self):
+	def draw(self, alpha=1):
 		self.display_surface.fill(CYAN)
 		for text in self.text:
 			text.draw(self.display_surface)
@@ -430,7 +454,7 @@ class TutorialState(State):
 		self.text = []
 		self.all_sprites = pygame.sprite.Group()
 		self.screen = screen
-		self.bg = pygame.image.load('graphics/ui/backgrounds/intro_' + screen + '.png').convert()
+		self.bg = load_image('graphics/ui/backgrounds/intro_' + screen + '.png', alpha=False)
 		self.bg_rect = self.bg.get_rect()
 
 	def explain_inputs(self):
@@ -438,20 +462,21 @@ class TutorialState(State):
 		self.clean_screen('inputs')
 
 		self.atk_sprites = pygame.sprite.Group()
+		self.timers = TimerScheduler()
 
 		# 4 sprites resembling the player's own, which show the various moves and
 		# cannot be interacted with / controlled by player
 		self.move_example = ExamplePlayer((115,300), 
-			self.all_sprites, 'move', self.magic_atk, self.destroy_atk)
+			self.all_sprites, 'move', self.magic_atk, self.destroy_atk, self.timers)
 		self.sword_example = ExamplePlayer((358,300), 
-			self.all_sprites, 'sword', self.magic_atk, self.destroy_atk)
+			self.all_sprites, 'sword', self.magic_atk, self.destroy_atk, self.timers)
 		self.magic_example = ExamplePlayer((602,300), 
-			self.all_sprites, 'magic', self.magic_atk, self.destroy_atk)
+			self.all_sprites, 'magic', self.magic_atk, self.destroy_atk, self.timers)
 		self.dash_example = ExamplePlayer((845,300), 
-			self.all_sprites, 'dash', self.magic_atk, self.destroy_atk)
+			self.all_sprites, 'dash', self.magic_atk, self.destroy_atk, self.timers)
 
 		# neatens edges surrounding magic attack
-		self.overlap = pygame.image.load('graphics/ui/inputs_overlap.png').convert_alpha()
+		self.overlap = load_image('graphics/ui/inputs_overlap.png')
 		self.overlap_rect = self.overlap.get_rect(topleft=(534,240))
 
 	def explain_stats(self):
@@ -467,14 +492,17 @@ class TutorialState(State):
 		self.clean_screen('final')
 
 	def update(self):
+		if self.screen == 'inputs':
+			self.timers.update()
+			for atk in self.atk_sprites:
+				atk.update_atk(self.magic_example, True)
+			self.all_sprites.update()
+
+	def draw(self, alpha=1):
 		self.display_surface.blit(self.bg, self.bg_rect)
 
 		if self.screen == 'inputs':
-			if self.atk_sprites:
-				for atk in self.atk_sprites:
-					atk.update_atk(self.magic_example, True)
-					self.atk_sprites.draw(self.display_surface)
-			self.all_sprites.update()
+			self.atk_sprites.draw(self.display_surface)
 			self.all_sprites.draw(self.display_surface)
 			self.display_surface.blit(self.overlap, self.overlap_rect)
 
@@ -514,37 +542,57 @@ class ForestState(State):
 		super().__init__()
 		self.next = 'dungeon'
 
-	def reset_next(self):
-		self.next = 'dungeon'
-
-	def new(self, data_store):
+		# the forest itself never changes, so it is only set up the first time it is
+		# visited - each visit after that only brings in a new player
 		self.display_surface = pygame.display.get_surface()
 
 		# sprite groups
 		self.all_sprites = ForestCameraGroup()
-		self.collision_sprites = pygame.sprite.Group()
+		self.collision_sprites = SpatialHashGroup()
 		self.interact_sprites = pygame.sprite.Group()
 		self.atk_sprites = pygame.sprite.Group()
 
 		# creates tile to enter dungeon
 		Tile(
 			pos=(SCREEN_WIDTH//2, 351),
-			surface=pygame.image.load('graphics/level/entertile.png').convert_alpha(),
+			surface=load_image('graphics/level/entertile.png'),
 			groups=(self.all_sprites, self.interact_sprites),
 			depth=LAYERS['floor'])
 
+		# menu and overlays
+		self.menus = MenuPages()
+		self.cost_text = {} 	# text showing each upgrade cost, made the first time it's shown
+		self.enter_bubble = TextBubble('enter dungeon?')
+		self.stamina_bubble = TextBubble('tired')
+		self.save_text = { 	# how the last save is going, shown under the general menu
+			'saving': Text('saving...', (MID_W,590), TEXT_S, WHITE),
+			'saved': Text('game saved.', (MID_W,590), TEXT_S, WHITE),
+			'failed': Text('save failed!', (MID_W,590), TEXT_S, WHITE)}
+		self.player = None
+
+	def reset_next(self):
+		self.next = 'dungeon'
+
+	def new(self, data_store):
+		# clears out the last visit's player and any attack they left behind
+		if self.player:
+			self.player.kill()
+		for atk in self.atk_sprites:
+			atk.kill()
+		self.timers = TimerScheduler() 	# ends player actions and cooldowns
+
 		# player instantiation
 		self.player = Player((740,400), self.all_sprites, self.collision_sprites, 
-			self.create_atk, self.destroy_atk, data_store, self.stamina_warning)
+			self.create_atk, self.destroy_atk, data_store, self.stamina_warning, self.timers)
+		self.current_atk = None
 
 		# menu and overlays
 		self.text = []
-		self.menu = Stats(self.player)
+		self.menu = self.menus.get(Stats)
 		self.overlay = Overlay(self.player)
-		self.enter_bubble = TextBubble('enter dungeon?')
 		self.draw_bubble = False
-		self.stamina_bubble = TextBubble('tired')
 		self.draw_stam_bubble = False
+		self.saved = False 	# whether the player has saved this visit
 
 	def create_atk(self, type):
 		# sprite which, on collision with an enemy hitbox, makes the enemy take damage
@@ -568,16 +616,13 @@ class ForestState(State):
 
 	def display_cost(self,type):
 		# displays cost to upgrade currently hovered stat on screen in the menu
-		self.text = []
-		self.text.append(Text('upgrade', 
-			(MID_W,430), 
-			TEXT_S, WHITE))
-		self.text.append(Text('cost:', 
-			(MID_W,460), 
-			TEXT_S, WHITE))
-		self.text.append(Text(str(self.player.upgrade[type][1]), 
-			(MID_W,510), 
-			TEXT_M, WHITE))
+		cost = self.player.upgrade[type][1]
+		if cost not in self.cost_text:
+			self.cost_text[cost] = [
+				Text('upgrade', (MID_W,430), TEXT_S, WHITE),
+				Text('cost:', (MID_W,460), TEXT_S, WHITE),
+				Text(str(cost), (MID_W,510), TEXT_M, WHITE)]
+		self.text = self.cost_text[cost]
 
 	def upgrade_check(self,type):
 		# checks if the user can actually upgrade the chosen stat
@@ -610,9 +655,14 @@ class ForestState(State):
 
 	def update(self):
 		# updater for when game is unpaused
+		self.timers.update()
 		self.all_sprites.update()
-		self.all_sprites.custom_draw(self.player)
+		self.player.hitbox.clamp_ip(self.all_sprites.floor_rect)	# player cannot go out of bounds
 		self.atk_logic()
+		self.interact_logic()
+
+	def draw(self, alpha=1):
+		self.all_sprites.custom_draw(self.player, alpha)
 
 		# overlay updates
 		self.overlay.display(self.player)
@@ -636,20 +686,20 @@ class ForestState(State):
 		for text in self.text:
 			text.draw(self.display_surface)
 
+		# saves are written in the background, so whether it has finished is shown
+		if self.saved and self.menu.type == 'general':
+			self.save_text[self.player.data_store.save_status()].draw(self.display_surface)
+
 	def event_handler(self, event, data_store, paused):
-		# separate event handlers for if the game is paused or unpaused
-		# (neatens appearance of methods)
-		if not paused:
-			self.game_events(event)
-		else:
+		# only the pause menu uses events - gameplay input is read once per tick
+		if paused:
 			self.paused_events(event, data_store)
 
-	def game_events(self, event):
-		# events when game is unpaused
-		keys = pygame.key.get_pressed()
+	def interact_logic(self):
+		# player can enter the dungeon when stood on the entrance
 		if pygame.sprite.spritecollide(self.player, self.interact_sprites, False):
 			self.draw_bubble = True
-			if keys[pygame.K_f]:
+			if held(INTERACT):
 				self.done = True
 		else:
 			self.draw_bubble = False
@@ -662,27 +712,27 @@ class ForestState(State):
 			# in the stats section of the menu
 			if self.menu.type == 'stats':	
 				if self.menu.general_tab.on_click(mouse_pos):
-					self.menu = General('forest')
+					self.menu = self.menus.get(General, 'forest')
 				else:
 					for upgrade in self.menu.upgrade_btns:
 						if upgrade.on_click(mouse_pos):
 							self.displaying_cost = False
 							check = self.upgrade_check(upgrade.type)
 							if check:
-								self.menu = NoUpgrade(check)
+								self.menu = self.menus.get(NoUpgrade, check)
 							else:
-								self.menu = UpgradeCheck(upgrade.type)
+								self.menu = self.menus.get(UpgradeCheck, upgrade.type)
 
 			# in the general section of the menu
 			elif self.menu.type == 'general':
 				if self.menu.stats_tab.on_click(mouse_pos):
-					self.menu = Stats(self.player)
+					self.menu = self.menus.get(Stats)
 				elif self.menu.save_game.on_click(mouse_pos):
-					self.menu = SaveCheck()
+					self.menu = self.menus.get(SaveCheck)
 				elif self.menu.main_menu.on_click(mouse_pos):
-					self.menu = Check('main_menu')
+					self.menu = self.menus.get(Check, 'main_menu')
 				elif self.menu.exit_desktop.on_click(mouse_pos):
-					self.menu = Check('desktop')
+					self.menu = self.menus.get(Check, 'desktop')
 
 			# game seeing if user definitely wants to quit
 			elif self.menu.type == 'check':
@@ -693,29 +743,30 @@ class ForestState(State):
 						self.next = 'menu'
 						self.done = True
 				elif self.menu.no_btn.on_click(mouse_pos):
-					self.menu = General('forest')
+					self.menu = self.menus.get(General, 'forest')
 
 			# game seeing if user definitely wants to save their current progress
 			elif self.menu.type == 'saving':
 				if self.menu.yes_btn.on_click(mouse_pos):
 					data_store.update_current(self.player.stats)
 					data_store.write_to_save()
-					self.menu = General('forest')
+					self.saved = True
+					self.menu = self.menus.get(General, 'forest')
 				elif self.menu.no_btn.on_click(mouse_pos):
-					self.menu = General('forest')
+					self.menu = self.menus.get(General, 'forest')
 
 			# menu lets user know that a stats upgrade cannot be made
 			elif self.menu.type == 'no_upgrade_full' or self.menu.type == 'no_upgrade_cost':
 				if self.menu.ok_btn.on_click(mouse_pos):
-					self.menu = Stats(self.player)
+					self.menu = self.menus.get(Stats)
 	
 			# checking if user definitely wants to upgrade stat
 			else:	
 				if self.menu.yes_btn.on_click(mouse_pos):
 					self.get_upgrade(self.menu.type)
-					self.menu = Stats(self.player)
+					self.menu = self.menus.get(Stats)
 				elif self.menu.no_btn.on_click(mouse_pos):
-					self.menu = Stats(self.player)
+					self.menu = self.menus.get(Stats)
 
 		for button in self.menu.buttons:
 			button.on_hover(mouse_pos)
@@ -739,79 +790,95 @@ class DungeonState(State):
 	def __init__(self):
 		super().__init__()
 		self.next = 'forest'
+		self.dungeon_options = {} 	# passed to get_dungeon, e.g. a map size or mob count for stress tests
+
+		# kept between visits - only the dungeon itself (and everything in it) is
+		# made again each time
+		self.display_surface = pygame.display.get_surface()
+		self.bg_rect = pygame.Rect((0,0), (SCREEN_WIDTH,SCREEN_HEIGHT))
+		self.tile_set = TileSheet('graphics/level/tiles.png')
+		self.exit_bubbles = []
+		self.exit_bubbles.append(
+			TextBubble('leave dungeon?'))
+		self.exit_bubbles.append(
+			TextBubble(("you won't be able to return."), pos=(545,350)))
+		self.stamina_bubble = TextBubble('tired')
+		self.menus = MenuPages()
+		self.cost_text = {} 	# text showing each upgrade cost, made the first time it's shown
 
 	def reset_next(self):
 		self.next = 'forest'
 
 	def new(self, data_store):
-		self.display_surface = pygame.display.get_surface()
-		self.bg_rect = pygame.Rect((0,0), (SCREEN_WIDTH,SCREEN_HEIGHT))
-
 		# sprite groups
-		self.all_sprites = DungeonCameraGroup()
-		self.collision_sprites = pygame.sprite.Group()
-		self.enemy_collision_sprites = pygame.sprite.Group()
+		self.static_sprites = StaticGroup()		# exit and flowers - only ever drawn, never updated
+		self.all_sprites = DungeonCameraGroup(self.static_sprites)
+		self.active_sprites = pygame.sprite.Group()	# sprites with behaviour to update every frame (besides enemies)
+		self.enemy_sprites = pygame.sprite.Group()
 		self.interact_sprites = pygame.sprite.Group()
 		self.atk_sprites = pygame.sprite.Group()
-		self.killable_sprites = pygame.sprite.Group()
+		self.killable_sprites = SpatialHashGroup(rect_attr='rect') # attacks only check the cells they cover
+		self.timers = TimerScheduler() 	# ends player and enemy actions and cooldowns
 
-		# generates dungeon and gets required tiles
-		self.tile_set = TileSheet('graphics/level/tiles.png')
+		# generates dungeon
 		self.generate_dungeon()
 
 		# generates player and sets spawn position
 		pos_x = self.dungeon.player_spawn[0] * TILE_SIZE
 		pos_y = self.dungeon.player_spawn[1] * TILE_SIZE
 		self.player = Player((pos_x, pos_y - TILE_SIZE), 
-			self.all_sprites, self.collision_sprites, 
+			[self.all_sprites, self.active_sprites], self.collision_grid.for_agent('player'), 
 			self.create_atk, self.destroy_atk, 
-			data_store, self.stamina_warning)
+			data_store, self.stamina_warning, self.timers)
 		self.current_atk = None
 
+		# what happens to each type of killable sprite when an attack hits it
+		self.hit_handlers = {
+			'flowers': self.hit_flowers,
+			'enemy': self.hit_enemy}
+
 		# menu and overlay
-		self.menu = Stats(self.player)
+		self.menu = self.menus.get(Stats)
 		self.overlay = Overlay(self.player)
-		self.exit_bubbles = []
-		self.exit_bubbles.append(
-			TextBubble('leave dungeon?'))
-		self.exit_bubbles.append(
-			TextBubble(("you won't be able to return."), pos=(545,350)))
 		self.draw_exit_bubble = False
-		self.stamina_bubble = TextBubble('tired')
 		self.draw_stam_bubble = False
 
 	def generate_dungeon(self):
 		# generates tilemap by calling get_dungeon function (from dun_gen),
 		# and then uses that to blit tiles to the screen
-		self.dungeon = get_dungeon()
-
-		# map layer 1
+		from dun_gen import get_dungeon # imported here so perlin_noise isn't loaded at startup
+		self.dungeon = get_dungeon(**self.dungeon_options)
+
+		# walls and corridors never move, so collisions are checked against the
+		# tilemap itself rather than against tile sprites
+		self.collision_grid = TileGrid(self.dungeon.tilemap)
+		self.sight = LineOfSight(self.collision_grid)
+		self.navigator = Navigator(self.collision_grid)
+
+		# enemies are updated by the scheduler (rather than through active_sprites),
+		# which skips or slows the ai of enemies away from the player
+		self.enemy_batch = EnemyBatch(self.sight, self.navigator, self.timers)
+		self.enemy_ai = AIScheduler(self.enemy_batch, self.dungeon.room_graph, self.killable_sprites)
+
+		# map layer 1 - floor and walls never change, so are kept in tile layers
+		# rather than as a sprite for every tile
+		self.floor_layer = TileLayer(self.collision_grid.width, self.collision_grid.height, LAYERS['floor'])
+		self.wall_layer = TileLayer(self.collision_grid.width, self.collision_grid.height, LAYERS['main'])
+		self.all_sprites.tile_layers = (self.floor_layer, self.wall_layer)
 		for row_coord, row in enumerate(self.dungeon.tilemap):
 			for col_coord, col in enumerate(row):
-				x = col_coord * TILE_SIZE
-				y = row_coord * TILE_SIZE
-
 				# wall tile
 				if isinstance(col,int):
 					if col <= 31:
 						image = self.tile_set.get_image(TILE_VALUES['edge'])
 					else:
 						image = self.tile_set.get_image(TILE_VALUES['plain'])
-					Tile(
-						pos=(x, y),
-						surface=image,
-						groups=(self.all_sprites,self.collision_sprites),
-						type='wall')
+					self.wall_layer.set_tile(col_coord, row_coord, image)
 
-				# corridor tiles (floor but in enemy col group for enemy collision purposes)
+				# corridor tiles (floor, but the collision grid blocks enemies from them)
 				elif col[0] == 'c':
 					image = self.tile_set.get_image(TILE_VALUES['floor'])
-					Tile(
-						pos=(x, y),
-						surface=image,
-						groups=(self.all_sprites,self.enemy_collision_sprites),
-						depth=LAYERS['floor'],
-						type='corridor')
+					self.floor_layer.set_tile(col_coord, row_coord, image)
 
 				# floor tiles
 				else:
@@ -820,15 +887,7 @@ class DungeonState(State):
 					elif col[0] == 'D':
 						sheet_pos = TILE_VALUES[col[1:]]
 						image = self.tile_set.get_image(sheet_pos)
-					Tile(
-						pos=(x, y),
-						surface=image,
-						groups=self.all_sprites,
-						depth=LAYERS['floor'],
-						type='floor')
-
-		# so enemies can't walk through walls OR in corridors
-		self.enemy_collision_sprites.add(self.collision_sprites)
+					self.floor_layer.set_tile(col_coord, row_coord, image)
 
 		# map layer 2
 		for row_coord, row in enumerate(self.dungeon.tilemap_overlay):
@@ -838,14 +897,16 @@ class DungeonState(State):
 
 				# enemies
 				if col == 'M':
-					Enemy(
+					enemy = Enemy(
 						pos=(x,y),
-						groups=[self.all_sprites,self.killable_sprites],
-						collision_sprites=self.enemy_collision_sprites,
+						groups=[self.all_sprites,self.enemy_sprites,self.killable_sprites],
+						collision_map=self.collision_grid.for_agent('enemy'),
+						batch=self.enemy_batch,
 						all_sprites=self.all_sprites,
 						dmg_player=self.dmg_player,
 						heal_player=self.heal_player,
-						add_wisps=self.add_wisps)	
+						add_wisps=self.add_wisps)
+					self.enemy_ai.add(enemy)
 
 				# exit point
 				elif col == 'X':
@@ -853,7 +914,7 @@ class DungeonState(State):
 					Tile(
 						pos=(x, y),
 						surface=image,
-						groups=[self.all_sprites,self.interact_sprites],
+						groups=[self.static_sprites,self.interact_sprites],
 						depth=LAYERS['mid_layer'],
 						type='interact')
 
@@ -863,7 +924,7 @@ class DungeonState(State):
 					Tile(
 						pos=(x, y),
 						surface=image,
-						groups=[self.all_sprites,self.killable_sprites],
+						groups=[self.static_sprites,self.killable_sprites],
 						depth=LAYERS['mid_layer'],
 						type='flowers')
 
@@ -881,26 +942,25 @@ class DungeonState(State):
 		self.current_atk = None
 
 	def atk_logic(self):
-		# more complex attack logic
+		# more complex attack logic - only killable sprites in the cells
+		# covered by the attack are checked
 		if self.current_atk:
 			self.current_atk.update_atk(self.player)
-			hit_sprites = pygame.sprite.spritecollide(self.current_atk,self.killable_sprites,False)
-			for sprite in hit_sprites:
-				if sprite.type == 'flowers':
-					# nearby flowers destroyed when player performs an attack
-					sprite.kill()
-				else:
-					# enemies take damage
-					sprite.get_hurt(self.player, self.current_atk.type)
+			for sprite in self.killable_sprites.collide(self.current_atk.rect):
+				self.hit_handlers[sprite.type](sprite)
+
+	def hit_flowers(self, flowers):
+		# nearby flowers destroyed when player performs an attack
+		flowers.kill()
+
+	def hit_enemy(self, enemy):
+		# enemies take damage
+		enemy.get_hurt(self.player, self.current_atk.type)
 
 	def dmg_player(self):
 		# called when enemy attack hits player
 		if self.player.vulnerable and not self.player.dashing:
-			self.player.health -= ENEMY['attack']
-			self.player.vulnerable = False
-			self.player.hit_time = pygame.time.get_ticks()
-			# player can't keep repeatedly taking damage within certain amount of time
-			# (gets recovery time)
+			self.player.get_hurt(ENEMY['attack'])
 
 	def heal_player(self):
 		# player health regens partially upon killing an enemy
@@ -928,16 +988,13 @@ class DungeonState(State):
 				self.draw_stam_bubble = True
 
 	def display_cost(self, type):
-		self.text = []
-		self.text.append(Text('upgrade', 
-			(MID_W,430), 
-			TEXT_S, WHITE))
-		self.text.append(Text('cost:', 
-			(MID_W,460), 
-			TEXT_S, WHITE))
-		self.text.append(Text(str(self.player.upgrade[type][1]), 
-			(MID_W,510), 
-			TEXT_M, WHITE))
+		cost = self.player.upgrade[type][1]
+		if cost not in self.cost_text:
+			self.cost_text[cost] = [
+				Text('upgrade', (MID_W,430), TEXT_S, WHITE),
+				Text('cost:', (MID_W,460), TEXT_S, WHITE),
+				Text(str(cost), (MID_W,510), TEXT_M, WHITE)]
+		self.text = self.cost_text[cost]
 
 	def upgrade_check(self, type):
 		if self.player.stats[type] < self.player.max_stats[type]:
@@ -952,14 +1009,19 @@ class DungeonState(State):
 		self.overlay = Overlay(self.player)
 
 	def update(self):
-		self.display_surface.fill(CYAN)
-
-		self.all_sprites.custom_draw(self.player)
-		self.all_sprites.update()
-		self.all_sprites.enemy_update(self.player)
+		self.timers.update()
+		self.sight.new_frame()
+		self.active_sprites.update()
+		self.navigator.set_target(self.player.rect.center)
+		self.enemy_ai.update(self.player)
 		self.atk_logic()
+		self.interact_logic()
 		self.check_death()
 
+	def draw(self, alpha=1):
+		self.display_surface.fill(CYAN)
+		self.all_sprites.custom_draw(self.player, alpha)
+
 		self.overlay.display(self.player)
 		if self.draw_exit_bubble:
 			for bubble in self.exit_bubbles:
@@ -968,17 +1030,15 @@ class DungeonState(State):
 			self.stamina_bubble.custom_draw()
 
 	def event_handler(self, event, data_store, paused):
-		if not paused:
-			self.game_events(event)
-		else:
+		if paused:
 			self.paused_events(event, data_store)
 
-	def game_events(self, event):
-		keys = pygame.key.get_pressed()
+	def interact_logic(self):
+		# player can leave the dungeon when stood on the exit
 		if pygame.sprite.spritecollide(self.player, self.interact_sprites, False):
 			self.draw_exit_bubble = True
-			if keys[pygame.K_f] and event.type == pygame.KEYDOWN:
-				# keydown so that dungeon count only goes up by 1
+			if pressed(INTERACT):
+				# only on the tick it is pressed, so that dungeon count only goes up by 1
 				self.done = True
 				self.player.stats['dungeons'] += 1
 		else:
@@ -993,26 +1053,26 @@ class DungeonState(State):
 
 			if self.menu.type == 'stats':	
 				if self.menu.general_tab.on_click(mouse_pos):
-					self.menu = General('dungeon')
+					self.menu = self.menus.get(General, 'dungeon')
 				else:
 					for upgrade in self.menu.upgrade_btns:
 						if upgrade.on_click(mouse_pos):
 							self.displaying_cost = False
 							check = self.upgrade_check(upgrade.type)
 							if check:
-								self.menu = NoUpgrade(check)
+								self.menu = self.menus.get(NoUpgrade, check)
 							else:
-								self.menu = UpgradeCheck(upgrade.type)
+								self.menu = self.menus.get(UpgradeCheck, upgrade.type)
 
 			elif self.menu.type == 'general':
 				if self.menu.stats_tab.on_click(mouse_pos):
-					self.menu = Stats(self.player)
+					self.menu = self.menus.get(Stats)
 				elif self.menu.leave_dungeon.on_click(mouse_pos):
-					self.menu = Check('forest')
+					self.menu = self.menus.get(Check, 'forest')
 				elif self.menu.main_menu.on_click(mouse_pos):
-					self.menu = Check('main_menu')
+					self.menu = self.menus.get(Check, 'main_menu')
 				elif self.menu.exit_desktop.on_click(mouse_pos):
-					self.menu = Check('desktop')
+					self.menu = self.menus.get(Check, 'desktop')
 
 			elif self.menu.type == 'check':
 				if self.menu.yes_btn.on_click(mouse_pos):
@@ -1026,18 +1086,18 @@ class DungeonState(State):
 						self.next = 'forest'
 						self.done = True
 				if self.menu.no_btn.on_click(mouse_pos):
-					self.menu = General('dungeon')
+					self.menu = self.menus.get(General, 'dungeon')
 
 			elif self.menu.type == 'no_upgrade_full' or self.menu.type == 'no_upgrade_cost':
 				if self.menu.ok_btn.on_click(mouse_pos):
-					self.menu = Stats(self.player)
+					self.menu = self.menus.get(Stats)
 	
 			else:
 				if self.menu.yes_btn.on_click(mouse_pos):
 					self.get_upgrade(self.menu.type)
-					self.menu = Stats(self.player)
+					self.menu = self.menus.get(Stats)
 				elif self.menu.no_btn.on_click(mouse_pos):
-					self.menu = Stats(self.player)
+					self.menu = self.menus.get(Stats)
 
 		for button in self.menu.buttons:
 			button.on_hover(mouse_pos)
@@ -1087,9 +1147,11 @@ class GameOverState(State):
 			(MID_W, 500),
 			TEXT_S, WHITE)
 
-	def update(self):	
-		self.display_surface.fill(RED)
+	def update(self):
 		self.fade_text.update_alpha()
+
+	def draw(self, alpha=1):
+		self.display_surface.fill(RED)
 		self.fade_text.draw(self.display_surface)
 		if self.fade_text.alpha >= 255:
 			self.small_text.draw(self.display_surface)
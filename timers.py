@@ -0,0 +1,70 @@
+from heapq import heappush, heappop
+
+import game_clock
+
+
+class Timer:
+	'''
+	a callback waiting in a TimerScheduler. cancelled timers are left in the
+	queue and skipped when they come up, rather than searched for and removed
+	'''
+	def __init__(self, due, callback, interval=None):
+		self.due = due 				# game time (ms) the callback is next run at
+		self.callback = callback
+		self.interval = interval 	# time between runs of a repeating timer, None to run once
+		self.cancelled = False
+
+	def cancel(self):
+		self.cancelled = True
+
+
+class TimerScheduler:
+	'''
+	runs callbacks once the game clock reaches the time they were scheduled for.
+	timers are kept in a heap ordered by when they are due, so each tick only
+	reads the clock once and looks at the soonest timer - nothing is checked for
+	timers which aren't close to running out
+	'''
+	def __init__(self, clock=None):
+		# clock to read time from - the game's current clock if not given
+		self.get_ticks = clock.get_ticks if clock else game_clock.get_ticks
+		self.queue = [] 	# (due, order scheduled, timer)
+		self.count = 0 		# timers scheduled so far, so timers due at once run in order
+
+	def __len__(self):
+		return len(self.queue)
+
+	def push(self, timer):
+		self.count += 1
+		heappush(self.queue, (timer.due, self.count, timer))
+
+	def after(self, delay, callback):
+		# runs callback once, delay ms from now
+		timer = Timer(self.get_ticks() + delay, callback)
+		self.push(timer)
+		return timer
+
+	def every(self, interval, callback, delay=0):
+		# runs callback every interval ms, starting delay ms from now. the interval
+		# must be above 0, otherwise the timer would always be due again
+		if interval <= 0:
+			raise ValueError(f'repeating timer interval must be above 0, not {interval}')
+		timer = Timer(self.get_ticks() + delay, callback, interval)
+		self.push(timer)
+		return timer
+
+	def update(self):
+		# runs the callbacks of every timer that has come due
+		current_time = self.get_ticks()
+		queue = self.queue
+		while queue and queue[0][0] <= current_time:
+			timer = heappop(queue)[2]
+			if timer.cancelled:
+				continue
+			if timer.interval is not None:
+				timer.due += timer.interval
+				self.push(timer)
+			timer.callback()
+
+	def clear(self):
+		self.queue = []
@@ -0,0 +1,57 @@
+from time import perf_counter
+
+class StartupReport:
+	'''
+	records how long each stage of starting up the game takes, so that the
+	time taken for the window to appear can be tracked
+	'''
+	def __init__(self, start=None):
+		self.start = start if start is not None else perf_counter()
+		self.last = self.start
+		self.stages = [] # (stage name, time taken by stage, time since start)
+
+	def mark(self, stage):
+		# records the time taken since the previous mark was made
+		now = perf_counter()
+		self.stages.append((stage, now - self.last, now - self.start))
+		self.last = now
+
+	def display(self):
+		# prints each stage and its duration in milliseconds
+		print('startup timings (ms):')
+		for stage, taken, total in self.stages:
+			print(f'  {stage:<20}{taken * 1000:>9.1f}{total * 1000:>10.1f}')
+
+
+class FrameStats:
+	'''
+	records how long each frame takes, so runs of the same gameplay can be
+	compared by their frame time percentiles
+	'''
+	def __init__(self):
+		self.times = [] # time taken by each frame, in seconds
+
+	def add(self, taken):
+		self.times.append(taken)
+
+	def percentile(self, sorted_times, percent):
+		# nearest rank percentile of an already sorted list
+		index = max(0, -(-len(sorted_times) * percent // 100) - 1)
+		return sorted_times[int(index)]
+
+	def display(self, title='frame times'):
+		# prints the frame count and frame time statistics in milliseconds
+		if not self.times:
+			print('no frames recorded')
+			return
+		times = sorted(self.times)
+		mean = sum(times) / len(times)
+		print(f'frames: {len(times)}')
+		print(f'{title} (ms):')
+		for name, taken in (
+			('mean', mean),
+			('p50', self.percentile(times, 50)),
+			('p95', self.percentile(times, 95)),
+			('p99', self.percentile(times, 99)),
+			('max', times[-1])):
+			print(f'  {name:<6}{taken * 1000:>9.2f}')